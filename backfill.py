@@ -0,0 +1,195 @@
+import argparse
+import logging
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import history_log
+import http_session
+import log_pipeline
+from checkpoint import open_store
+from config import getenv
+from delivery import TokenBucket
+from engine import TENANTS_FILE, load_tenants
+from homework import current_tenant, notify_changes
+from streaming import stream_api_answer
+
+BACKFILL_CONCURRENCY = int(getenv('BACKFILL_CONCURRENCY', 16))
+# Запросов к API в секунду на всю загрузку.
+BACKFILL_RATE = float(getenv('BACKFILL_RATE', 20))
+PROGRESS_INTERVAL = 5
+
+
+class Backfill:
+    """Загружает историю работ с from_date=0 и сохраняет её в состояние.
+
+    Запросы идут в concurrency потоков, но не чаще rate в секунду. Чаты
+    с общим токеном получают один ответ на всех. Ответ разбирается
+    потоком (streaming.HomeworkStream) с теми же проверками, что и в
+    check_response, а каждая работа сразу проходит notify_changes с
+    muted. Так снимки статусов, история и журнал статусов заполняются
+    как при обычном опросе, но история не держится в памяти целиком, а
+    сообщения в Telegram не отправляются.
+    """
+
+    def __init__(self, tenants, store, concurrency=BACKFILL_CONCURRENCY,
+                 rate=BACKFILL_RATE, clock=time.monotonic):
+        self.store = store
+        self.concurrency = concurrency
+        self.clock = clock
+        self.bucket = TokenBucket(rate, capacity=concurrency, clock=clock)
+        self.groups = defaultdict(list)
+        for tenant in tenants:
+            self.groups[tenant.token].append(tenant)
+        self.done = 0
+        self.failed = 0
+        self.homeworks = 0
+        self._lock = threading.Lock()
+
+    def restore(self):
+        """Подхватывает уже сохранённое состояние пользователей."""
+        saved = self.store.load_all()
+        for group in self.groups.values():
+            for tenant in group:
+                if tenant.key in saved:
+                    tenant.restore(saved[tenant.key])
+
+    def fetch(self, tenant):
+        """Запрашивает всю историю работ токена пользователя потоком."""
+        time.sleep(self.bucket.reserve())
+        context = current_tenant.set(tenant)
+        try:
+            return stream_api_answer(0)
+        finally:
+            current_tenant.reset(context)
+
+    def seed(self, tenant, homeworks, timestamp):
+        """Учитывает работы из ответа в состоянии пользователя."""
+        context = current_tenant.set(tenant)
+        try:
+            return notify_changes(
+                None, tenant.snapshot, homeworks, 0, timestamp,
+                muted=True, history=tenant.history,
+            )
+        finally:
+            current_tenant.reset(context)
+
+    def seed_group(self, group, stream):
+        """Разбирает ответ по одной работе и заполняет состояние чатов.
+
+        Каждая работа сразу сравнивается со снимками всех чатов токена.
+        current_date приходит в конце ответа, поэтому смены статусов
+        пишутся в историю со временем запроса. Состояние сохраняется, а
+        события попадают в журнал статусов, только если ответ разобран до
+        конца. Возвращает число работ.
+        """
+        observed = int(time.time())
+        messages = [None] * len(group)
+        status = None
+        count = 0
+        try:
+            with history_log.deferred():
+                for homework in stream:
+                    if not count:
+                        # Первой в ответе идёт последняя работа.
+                        status = homework.get('status')
+                    count += 1
+                    for index, tenant in enumerate(group):
+                        message = self.seed(tenant, [homework], observed)
+                        messages[index] = message or messages[index]
+        finally:
+            stream.close()
+        for tenant, message in zip(group, messages):
+            if not count:
+                message = self.seed(tenant, [], stream.current_date)
+            tenant.timestamp = stream.current_date
+            tenant.record_cycle(message, status)
+            self.store.save(tenant.key, tenant.checkpoint())
+        return count
+
+    def run_group(self, group):
+        """Загружает историю одного токена для всех его чатов."""
+        try:
+            homeworks = len(group) * self.seed_group(
+                group, self.fetch(group[0])
+            )
+        except Exception as error:
+            logging.error('%s: %s', group[0], error)
+            with self._lock:
+                self.failed += len(group)
+            return
+        with self._lock:
+            self.done += len(group)
+            self.homeworks += homeworks
+
+    def report(self, started, total):
+        """Пишет в лог прогресс и скорость загрузки."""
+        elapsed = max(self.clock() - started, 1e-9)
+        finished = self.done + self.failed
+        logging.info(
+            'Загружено %d/%d, ошибок %d, работ %d, %.1f польз./с',
+            finished, total, self.failed, self.homeworks, finished / elapsed,
+        )
+
+    def run(self):
+        """Загружает историю всех пользователей, возвращает число ошибок."""
+        self.restore()
+        total = sum(len(group) for group in self.groups.values())
+        started = last_report = self.clock()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(self.run_group, group)
+                for group in self.groups.values()
+            ]
+            for future in as_completed(futures):
+                future.result()
+                self.store.maybe_flush()
+                history_log.maybe_flush()
+                if self.clock() - last_report >= PROGRESS_INTERVAL:
+                    last_report = self.clock()
+                    self.report(started, total)
+        self.store.flush()
+        history_log.flush()
+        self.report(started, total)
+        return self.failed
+
+
+def main():
+    """Загружает историю работ пользователей из файла."""
+    parser = argparse.ArgumentParser(
+        description='Заполняет состояние пользователей по истории работ'
+    )
+    parser.add_argument('--tenants', default=TENANTS_FILE)
+    parser.add_argument(
+        '--concurrency', type=int, default=BACKFILL_CONCURRENCY
+    )
+    parser.add_argument(
+        '--rate', type=float, default=BACKFILL_RATE,
+        help='запросов к API в секунду',
+    )
+    args = parser.parse_args()
+    http_session.install_session(
+        http_session.ManagedSession(pool_size=args.concurrency)
+    )
+    store = open_store()
+    log = history_log.open_log()
+    try:
+        failed = Backfill(
+            load_tenants(args.tenants), store, args.concurrency, args.rate,
+        ).run()
+    finally:
+        store.close()
+        if log is not None:
+            log.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s, %(levelname)s, %(message)s',
+    )
+    log_pipeline.start_queue_logging()
+    sys.exit(main())
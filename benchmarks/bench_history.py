@@ -0,0 +1,54 @@
+"""Стоимость записи и чтения журнала статусов.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_history
+"""
+import os
+import tempfile
+import time
+
+from history_log import HistoryLog
+
+EVENTS = 1_000_000
+TENANTS = 10_000
+START = 1_600_000_000
+
+
+def main():
+    """Печатает стоимость записи, открытия, выборки и сжатия."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.log')
+        log = HistoryLog(path)
+        tenants = [f'chat{number}' for number in range(TENANTS)]
+        started = time.perf_counter()
+        for number in range(EVENTS):
+            log.append(
+                tenants[number % TENANTS], number % 11,
+                'reviewing' if number % 3 else 'approved', START + number,
+            )
+        log.flush()
+        elapsed = time.perf_counter() - started
+        print(f'append     {elapsed / EVENTS * 1e6:>8.2f} мкс на событие')
+        print(f'размер     {os.path.getsize(path) / 2 ** 20:>8.1f} МиБ')
+        log.close()
+
+        started = time.perf_counter()
+        log = HistoryLog(path)
+        print(f'открытие   {time.perf_counter() - started:>8.2f} с')
+
+        started = time.perf_counter()
+        for tenant in tenants[:1000]:
+            log.events(tenant, START, START + EVENTS // 2)
+        elapsed = time.perf_counter() - started
+        print(f'выборка    {elapsed / 1000 * 1e6:>8.1f} мкс на пользователя')
+
+        started = time.perf_counter()
+        kept = log.compact(retention=EVENTS // 2, now=START + EVENTS)
+        elapsed = time.perf_counter() - started
+        print(f'сжатие     {elapsed:>8.2f} с, осталось {kept} событий')
+        log.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Накладные расходы логирования на цикл опроса.
+
+Сравнивает прежний способ (f-строки и полный ответ в logging.info) с
+ленивым форматированием и Truncated, при DEBUG и WARNING, с записью
+в вызывающем потоке и через очередь.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_logging
+"""
+import logging
+import os
+import time
+
+from log_pipeline import Truncated, start_queue_logging
+
+CYCLES = 2000
+RESPONSE = {
+    'homeworks': [
+        {'id': number, 'homework_name': f'hw{number}', 'status': 'approved'}
+        for number in range(200)
+    ],
+    'current_date': 1581604970,
+}
+MESSAGE = 'Изменился статус проверки работы "hw1". Ура!'
+PARAMS = {'url': 'https://example.com/', 'params': {'from_date': 0}}
+
+
+def eager_cycle():
+    """Логирование как до перехода на ленивые аргументы."""
+    logging.debug(f'Параметры запроса: {PARAMS}')
+    logging.info(RESPONSE)
+    logging.debug(f'Отправлено на chat_id:{1}, сообщениe: {MESSAGE}')
+
+
+def lazy_cycle():
+    """Логирование с ленивыми аргументами и обрезкой ответа."""
+    logging.debug('Параметры запроса: %s', PARAMS)
+    logging.info('Ответ API: %s', Truncated(RESPONSE))
+    logging.debug('Отправлено на chat_id:%s, сообщениe: %s', 1, MESSAGE)
+
+
+def measure(cycle):
+    """Возвращает время одного цикла в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(CYCLES):
+        cycle()
+    return (time.perf_counter() - started) / CYCLES * 1e6
+
+
+def configure(level, queued):
+    """Настраивает корневой логгер и возвращает слушатель очереди."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.StreamHandler(open(os.devnull, 'w')))
+    root.setLevel(level)
+    if not queued:
+        return None
+    return start_queue_logging(root, queue_size=CYCLES * 10)
+
+
+def main():
+    """Печатает таблицу результатов."""
+    print(f'{"level":>8} {"output":>7} {"eager, мкс":>11} {"lazy, мкс":>10}')
+    for level in (logging.DEBUG, logging.WARNING):
+        for queued in (False, True):
+            listener = configure(level, queued)
+            eager = measure(eager_cycle)
+            lazy = measure(lazy_cycle)
+            if listener is not None:
+                listener.stop()
+            print(
+                f'{logging.getLevelName(level):>8} '
+                f'{"queue" if queued else "sync":>7} '
+                f'{eager:>11.1f} {lazy:>10.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
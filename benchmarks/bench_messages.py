@@ -0,0 +1,35 @@
+"""Стоимость сборки сообщения о смене статуса.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_messages
+"""
+import timeit
+
+from homework import HOMEWORK_VERDICTS, MESSAGES
+
+NUMBER = 1_000_000
+
+
+def fstring(name, status):
+    """Прежняя сборка: f-строка и поиск вердикта на каждый вызов."""
+    verdict = HOMEWORK_VERDICTS.get(status)
+    return f'Изменился статус проверки работы "{name}". {verdict}'
+
+
+def main():
+    """Печатает стоимость сборки в наносекундах."""
+    name = 'student__hw05_final.zip'
+    template = MESSAGES._status[MESSAGES.default]['approved']
+    operations = {
+        'f-строка': lambda: fstring(name, 'approved'),
+        'шаблон': lambda: template.render(name=name),
+        'шаблон + кэш': lambda: MESSAGES.status_message(name, 'approved'),
+    }
+    for label, operation in operations.items():
+        elapsed = timeit.timeit(operation, number=NUMBER)
+        print(f'{label:<14} {elapsed / NUMBER * 1e9:>8.0f} нс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Стоимость одного наблюдения метрики.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_metrics
+"""
+import timeit
+
+from metrics import Counter, Histogram, Registry
+
+NUMBER = 1_000_000
+
+
+def main():
+    """Печатает стоимость операций в наносекундах."""
+    registry = Registry()
+    histogram = Histogram('bench_seconds', 'Бенчмарк.', registry=registry)
+    counter = Counter('bench', 'Бенчмарк.', registry=registry)
+    operations = {
+        'Histogram.observe': lambda: histogram.observe(0.3),
+        'Counter.inc(label)': lambda: counter.inc(exception='RequestUnclear'),
+    }
+    for name, operation in operations.items():
+        elapsed = timeit.timeit(operation, number=NUMBER)
+        print(f'{name:<20} {elapsed / NUMBER * 1e9:>8.0f} нс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Сквозная нагрузка на конвейер опроса с локальными серверами.
+
+PollingEngine опрашивает FakePracticum и отправляет уведомления в
+FakeTelegram через DeliveryQueue — как в боевом engine.py, но с
+адресами локальных серверов. Печатает опросы в секунду, p50/p99
+длительности цикла, задержку уведомления и пиковый RSS и сравнивает их
+с сохранёнными в baselines.json.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --scenario flaky --duration 30
+    python -m benchmarks.bench_pipeline --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import telegram
+
+import deadline
+import engine
+import homework
+import http_session
+from benchmarks.fake_servers import FakePracticum, FakeTelegram, LagTracker
+from delivery import DeliveryQueue
+from http_cache import ResponseCache
+from polling_policy import AdaptivePolicy
+
+BASELINES = Path(__file__).with_name('baselines.json')
+# Допустимое ухудшение относительно базовой линии.
+TOLERANCE = 0.2
+HIGHER_IS_BETTER = frozenset(['polls_per_sec'])
+BOT_TOKEN = '123456:bench'
+
+SCENARIOS = {
+    'steady': {'tenants': 200, 'latency': 0.005},
+    'slow_api': {'tenants': 200, 'latency': 0.2},
+    'flaky': {'tenants': 200, 'latency': 0.005, 'error_rate': 0.2},
+    'large_payload': {'tenants': 50, 'latency': 0.005, 'homeworks': 500},
+    'slow_telegram': {
+        'tenants': 200, 'latency': 0.005, 'telegram_latency': 0.1,
+    },
+}
+DEFAULTS = {
+    'tenants': 100,
+    'latency': 0.0,
+    'error_rate': 0.0,
+    'homeworks': 5,
+    'change_rate': 5.0,
+    'telegram_latency': 0.0,
+    'telegram_error_rate': 0.0,
+    'interval': 1.0,
+    'concurrency': 64,
+}
+
+
+def fixed_policy(interval):
+    """Возвращает политику с одним интервалом для всех статусов."""
+    intervals = dict.fromkeys(
+        (None, 'reviewing', 'rejected', 'approved'), interval
+    )
+    return AdaptivePolicy(
+        intervals=intervals, max_interval=interval, backoff_factor=1
+    )
+
+
+def timed(function, durations):
+    """Оборачивает function, записывая длительность каждого вызова."""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - started)
+    return wrapper
+
+
+def percentile(values, percent):
+    """Возвращает процентиль значений или 0, если их мало."""
+    if len(values) < 2:
+        return 0.0
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+async def run_engine(polling_engine, duration):
+    """Крутит движок duration секунд."""
+    try:
+        await asyncio.wait_for(polling_engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def run_scenario(duration, **options):
+    """Прогоняет сценарий и возвращает словарь результатов."""
+    config = {**DEFAULTS, **options}
+    tracker = LagTracker()
+    practicum = FakePracticum(
+        tracker, config['tenants'], homeworks=config['homeworks'],
+        change_rate=config['change_rate'], latency=config['latency'],
+        error_rate=config['error_rate'],
+    ).start()
+    telegram_server = FakeTelegram(
+        tracker, latency=config['telegram_latency'],
+        error_rate=config['telegram_error_rate'],
+    ).start()
+    durations = []
+    run_cycle = engine.run_cycle
+    endpoint = homework.ENDPOINT
+    engine.run_cycle = timed(run_cycle, durations)
+    homework.ENDPOINT = practicum.url
+    # Исполнитель и пул соединений — как в engine.serve().
+    hedger = deadline.open_hedger(config['concurrency'])
+    deadline.install_hedger(hedger)
+    http_session.install_session(
+        http_session.ManagedSession(pool_size=hedger.workers)
+    )
+    queue = DeliveryQueue(
+        telegram.Bot(BOT_TOKEN, base_url=telegram_server.base_url)
+    ).start()
+    tenants = [
+        engine.Tenant(f'token{number}', f'chat{number}')
+        for number in range(config['tenants'])
+    ]
+    # Начальные статусы известны, чтобы первый опрос не слал всё сразу.
+    for tenant in tenants:
+        for work in practicum.homeworks(tenant.token):
+            tenant.snapshot.update(work)
+    polling_engine = engine.PollingEngine(
+        queue, tenants, concurrency=config['concurrency'],
+        retry_period=config['interval'],
+        policy=fixed_policy(config['interval']), cache=ResponseCache(),
+    )
+    started = time.monotonic()
+    try:
+        asyncio.run(run_engine(polling_engine, duration))
+        elapsed = time.monotonic() - started
+        queue.close(timeout=5)
+    finally:
+        engine.run_cycle = run_cycle
+        homework.ENDPOINT = endpoint
+        http_session.get_session().close()
+        http_session.install_session(None)
+        hedger.close()
+        deadline.install_hedger(None)
+        practicum.stop()
+        telegram_server.stop()
+    return {
+        'polls_per_sec': round(practicum.requests / elapsed, 1),
+        'cycle_p50_ms': round(percentile(durations, 50) * 1000, 2),
+        'cycle_p99_ms': round(percentile(durations, 99) * 1000, 2),
+        'lag_p50_ms': round(percentile(tracker.lags, 50) * 1000, 1),
+        'lag_p99_ms': round(percentile(tracker.lags, 99) * 1000, 1),
+        'rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def regressions(result, baseline, tolerance=TOLERANCE):
+    """Возвращает метрики, ухудшившиеся больше чем на tolerance."""
+    worse = []
+    for name, value in result.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        change = (value - expected) / expected
+        if name in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            worse.append(name)
+    return worse
+
+
+def load_baselines():
+    """Читает сохранённые базовые линии."""
+    if not BASELINES.exists():
+        return {}
+    return json.loads(BASELINES.read_text(encoding='utf-8'))
+
+
+def main():
+    """Прогоняет сценарии и сравнивает с базовыми линиями."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--scenario', choices=sorted(SCENARIOS), action='append',
+        help='сценарий, по умолчанию — все',
+    )
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+    # Вывод лога в бенчмарке только мешает.
+    logging.disable(logging.CRITICAL)
+    baselines = load_baselines()
+    failed = False
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(args.duration, **SCENARIOS[name])
+        worse = regressions(result, baselines.get(name, {}))
+        failed = failed or bool(worse)
+        print(name)
+        for metric, value in result.items():
+            expected = baselines.get(name, {}).get(metric, '-')
+            mark = '  РЕГРЕССИЯ' if metric in worse else ''
+            print(f'  {metric:<14} {value:>10} (база {expected}){mark}')
+        if args.save_baseline:
+            baselines[name] = result
+    if args.save_baseline:
+        BASELINES.write_text(
+            json.dumps(baselines, indent=2, sort_keys=True) + '\n',
+            encoding='utf-8',
+        )
+    sys.exit(1 if failed and not args.save_baseline else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Время планирования на тик при 1k, 10k и 100k пользователях.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_scheduler
+"""
+import random
+import time
+
+from scheduler import PollScheduler
+
+PERIOD = 600
+TICKS = 600
+SIZES = (1_000, 10_000, 100_000)
+
+
+class FakeClock:
+    """Часы, которые двигает сам бенчмарк."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(size):
+    """Гоняет планировщик один период и возвращает время на тик, мкс."""
+    clock = FakeClock()
+    scheduler = PollScheduler(clock=clock, rng=random.Random(1))
+    started = time.perf_counter()
+    for key in range(size):
+        scheduler.add(key, PERIOD, spread=True)
+    add_time = time.perf_counter() - started
+
+    worst = 0.0
+    started = time.perf_counter()
+    for _ in range(TICKS):
+        clock.now += 1
+        tick_started = time.perf_counter()
+        for key in scheduler.pop_due():
+            scheduler.add(key, PERIOD)
+        worst = max(worst, time.perf_counter() - tick_started)
+    total = time.perf_counter() - started
+    return add_time / size * 1e6, total / TICKS * 1e6, worst * 1e6
+
+
+def main():
+    """Печатает таблицу результатов."""
+    print(f'{"jobs":>8} {"add, мкс":>10} {"tick, мкс":>11} {"max, мкс":>10}')
+    for size in SIZES:
+        add, tick, worst = run(size)
+        print(f'{size:>8} {add:>10.2f} {tick:>11.1f} {worst:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Время импорта модулей бота по данным python -X importtime.
+
+Каждый модуль импортируется в отдельном процессе, чтобы кэш sys.modules
+не искажал замер. Печатаются самые дорогие вложенные импорты.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_startup
+"""
+import subprocess
+import sys
+
+MODULES = ('homework', 'engine', 'supervisor')
+TOP = 8
+
+
+def import_times(module):
+    """Возвращает [(мкс с вложенными, имя)] импортов модуля."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times.append((int(cumulative), name.strip()))
+    return times
+
+
+def main():
+    """Печатает общее время импорта и самые дорогие модули."""
+    for module in MODULES:
+        times = import_times(module)
+        total = dict((name, spent) for spent, name in times)[module]
+        print(f'{module:<12} {total / 1000:>8.1f} мс')
+        for spent, name in sorted(times, reverse=True)[1:TOP + 1]:
+            print(f'    {name:<30} {spent / 1000:>8.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
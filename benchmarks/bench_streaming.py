@@ -0,0 +1,76 @@
+"""Пиковая память и время разбора ответа API: целиком и потоком.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_streaming
+"""
+import json
+import time
+import tracemalloc
+
+from homework import check_response, parse_status
+from streaming import CHUNK_SIZE, HomeworkStream
+
+SIZES = (10, 1_000, 100_000)
+
+
+def make_payload(size):
+    """Строит синтетический ответ API с size работами."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number,
+                'status': 'approved',
+                'homework_name': f'student__hw{number:06}.zip',
+                'reviewer_comment': 'Всё нравится, отличная работа!',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for number in range(size)
+        ],
+        'current_date': 1581604970,
+    }, ensure_ascii=False).encode()
+
+
+def chunks(payload):
+    """Нарезает ответ на куски, как iter_content."""
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+
+def parse_full(payload):
+    """Текущий путь: json целиком, check_response, parse_status."""
+    response = json.loads(payload)
+    for homework in check_response(response):
+        parse_status(homework)
+
+
+def parse_stream(payload):
+    """Потоковый путь: разбор и проверка за один проход."""
+    for homework in HomeworkStream(chunks(payload)):
+        parse_status(homework)
+
+
+def measure(func, payload):
+    """Возвращает время в мс и пиковую память в КиБ."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(payload)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+
+def main():
+    """Печатает таблицу результатов."""
+    print(f'{"homeworks":>9} {"mode":>7} {"time, мс":>10} {"peak, КиБ":>11}')
+    for size in SIZES:
+        payload = make_payload(size)
+        for name, func in (('full', parse_full), ('stream', parse_stream)):
+            elapsed, peak = measure(func, payload)
+            print(f'{size:>9} {name:>7} {elapsed:>10.1f} {peak:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Память на одного пользователя в процессе опроса.
+
+Создаёт TENANTS пользователей с типичным состоянием после нескольких
+циклов: пара работ в снимке, последнее уведомление, запись в истории.
+Память считается через tracemalloc.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_tenants
+"""
+import gc
+import json
+import tracemalloc
+
+from engine import load_tenants
+from homework import last_status, notify_changes
+from status_diff import StatusSnapshot
+
+TENANTS = 100_000
+
+
+class NullBot:
+    """Бот, который ничего не отправляет."""
+
+    def send_message(self, chat_id, text):
+        """Отбрасывает сообщение."""
+
+
+def make_tenants(path):
+    """Загружает пользователей и проводит каждого через один цикл."""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump([
+            {'practicum_token': f'y0_{number:040d}', 'chat_id': number,
+             'locale': 'ru'}
+            for number in range(TENANTS)
+        ], file)
+    tenants = load_tenants(path)
+    bot = NullBot()
+    for number, tenant in enumerate(tenants):
+        homeworks = json.loads(json.dumps([
+            {'id': number * 2, 'homework_name': f'user{number}__hw1.zip',
+             'status': 'approved'},
+            {'id': number * 2 + 1, 'homework_name': f'user{number}__hw2.zip',
+             'status': 'reviewing'},
+        ]))
+        message = notify_changes(
+            bot, tenant.snapshot, homeworks, 0, 1_700_000_000,
+            history=tenant.history,
+        )
+        tenant.record_cycle(message, last_status(homeworks))
+    return tenants
+
+
+def main():
+    """Печатает память на пользователя."""
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tenants.json')
+        gc.collect()
+        tracemalloc.start()
+        tenants = make_tenants(path)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(f'пользователей {len(tenants):>10}')
+    print(f'всего         {current / 2 ** 20:>10.1f} МиБ')
+    print(f'на одного     {current / len(tenants):>10.0f} байт')
+    sample = tenants[0]
+    assert isinstance(sample.snapshot, StatusSnapshot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Локальные заменители API Практикума и Bot API Telegram для нагрузки.
+
+Оба сервера работают в фоновых потоках одного процесса и делят объект
+LagTracker: Практикум отмечает момент смены статуса работы, Telegram —
+момент получения сообщения в чат этого пользователя.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class LagTracker:
+    """Задержка от смены статуса на сервере до уведомления в Telegram."""
+
+    def __init__(self):
+        self.pending = {}
+        self.lags = []
+        self._lock = threading.Lock()
+
+    def changed(self, chat_id):
+        """Отмечает смену статуса работы пользователя."""
+        with self._lock:
+            self.pending.setdefault(str(chat_id), time.monotonic())
+
+    def delivered(self, chat_id):
+        """Отмечает сообщение в чат пользователя."""
+        with self._lock:
+            changed = self.pending.pop(str(chat_id), None)
+            if changed is not None:
+                self.lags.append(time.monotonic() - changed)
+
+
+class FakeServer(ThreadingHTTPServer):
+    """HTTP сервер с задержкой и долей ошибок ответа."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, seed=0):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.url = f'http://127.0.0.1:{self.server_address[1]}/'
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(
+            target=self.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер."""
+        self.shutdown()
+        self.server_close()
+
+    def admit(self):
+        """Считает запрос, выдерживает задержку; False — ответить ошибкой."""
+        with self.lock:
+            self.requests += 1
+            failed = self.rng.random() < self.error_rate
+            self.errors += failed
+        if self.latency:
+            time.sleep(self.latency)
+        return not failed
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: ответ JSON и тихий лог."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status, data):
+        """Отправляет ответ JSON."""
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PracticumHandler(FakeHandler):
+    """Отдаёт список работ пользователя по токену из заголовка."""
+
+    def do_GET(self):
+        if not self.server.admit():
+            self.reply(500, {'code': 'UnknownError'})
+            return
+        token = self.headers.get('Authorization', '').split()[-1]
+        self.reply(200, {
+            'homeworks': self.server.homeworks(token),
+            'current_date': int(time.time()),
+        })
+
+
+class FakePracticum(FakeServer):
+    """API Практикума, где статусы работ меняются change_rate раз в секунду.
+
+    token — это chat_id пользователя с префиксом token, так сервер знает,
+    в какой чат должно прийти уведомление о смене.
+    """
+
+    def __init__(self, tracker, tenants, homeworks=5, change_rate=1.0,
+                 **kwargs):
+        super().__init__(PracticumHandler, **kwargs)
+        self.tracker = tracker
+        self.tenants = tenants
+        self.change_rate = change_rate
+        self.statuses = {
+            f'token{number}': ['reviewing'] * homeworks
+            for number in range(tenants)
+        }
+        self._running = False
+
+    def homeworks(self, token):
+        """Возвращает текущие работы пользователя."""
+        with self.lock:
+            statuses = list(self.statuses.get(token, ()))
+        return [
+            {
+                'id': number,
+                'status': status,
+                'homework_name': f'{token}__hw{number:04}.zip',
+                'reviewer_comment': 'Всё нравится, отличная работа!',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for number, status in enumerate(statuses)
+        ]
+
+    def change(self):
+        """Меняет статус случайной работы случайного пользователя."""
+        number = self.rng.randrange(self.tenants)
+        token = f'token{number}'
+        with self.lock:
+            statuses = self.statuses[token]
+            index = self.rng.randrange(len(statuses))
+            current = statuses[index]
+            statuses[index] = self.rng.choice(
+                [status for status in STATUSES if status != current]
+            )
+        self.tracker.changed(f'chat{number}')
+
+    def _change_loop(self):
+        """Меняет статусы с заданной частотой, пока сервер работает."""
+        while self._running:
+            time.sleep(1 / self.change_rate)
+            self.change()
+
+    def start(self):
+        """Запускает сервер и смену статусов."""
+        super().start()
+        if self.change_rate:
+            self._running = True
+            threading.Thread(target=self._change_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Останавливает смену статусов и сервер."""
+        self._running = False
+        super().stop()
+
+
+class TelegramHandler(FakeHandler):
+    """Принимает sendMessage, как Bot API."""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if not self.server.admit():
+            self.reply(500, {'ok': False, 'description': 'Internal error'})
+            return
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(body or b'{}')
+        else:
+            data = {
+                key: values[0]
+                for key, values in parse_qs(body.decode()).items()
+            }
+        if not urlparse(self.path).path.endswith('/sendMessage'):
+            self.reply(404, {'ok': False, 'description': 'Not Found'})
+            return
+        chat_id = data.get('chat_id')
+        self.server.tracker.delivered(chat_id)
+        with self.server.lock:
+            self.server.messages += 1
+            message_id = self.server.messages
+        self.reply(200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+
+class FakeTelegram(FakeServer):
+    """Bot API Telegram; адрес для telegram.Bot — base_url."""
+
+    def __init__(self, tracker, **kwargs):
+        super().__init__(TelegramHandler, **kwargs)
+        self.tracker = tracker
+        self.messages = 0
+        self.base_url = f'{self.url}bot'
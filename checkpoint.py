@@ -0,0 +1,319 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from config import getenv
+from lazy import lazy_import
+
+# Нужен только хранилищу SQLite, без CHECKPOINT_PATH не загружается.
+sqlite3 = lazy_import('sqlite3')
+
+CHECKPOINT_PATH = getenv('CHECKPOINT_PATH')
+CHECKPOINT_BACKEND = getenv('CHECKPOINT_BACKEND', 'sqlite')
+# Сколько изменений или секунд копится перед групповой записью.
+FLUSH_BATCH_SIZE = 1000
+FLUSH_INTERVAL = 1.0
+# Во сколько раз журнал может превышать число ключей до сжатия.
+LOG_COMPACT_RATIO = 4
+
+Checkpoint = namedtuple(
+    'Checkpoint',
+    ('timestamp', 'status', 'message', 'snapshot'),
+    defaults=(None,),
+)
+# Сообщение исходящей очереди: id — ключ идемпотентности, key — ключ
+# пользователя, по циклу которого сообщение создано.
+OutboxMessage = namedtuple(
+    'OutboxMessage', ('id', 'key', 'chat_id', 'text')
+)
+
+
+def make_key(token, chat_id):
+    """Возвращает ключ пользователя, не раскрывающий его токен."""
+    digest = hashlib.sha256(str(token).encode()).hexdigest()[:16]
+    return f'{chat_id}:{digest}'
+
+
+class CheckpointStore:
+    """Хранилище from_date и последнего отправленного статуса.
+
+    save() лишь кладёт запись в буфер, запись на диск идёт пачкой в
+    flush(), поэтому сохранение тысяч пользователей стоит одной
+    транзакции. Последнее изменение ключа в буфере вытесняет предыдущие.
+
+    Хранилище с durable_outbox пишет сообщения цикла в исходящую очередь
+    той же транзакцией, что и состояние, а отметки об отправке удаляет
+    из неё следующей пачкой. После записи пачки on_commit получает её
+    сообщения для отправки.
+    """
+
+    durable_outbox = False
+
+    def __init__(self, batch_size=FLUSH_BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._outbox = []
+        self._delivered = set()
+        self.on_commit = None
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def load_all(self):
+        """Возвращает словарь всех сохранённых состояний."""
+        raise NotImplementedError
+
+    def _write(self, items):
+        """Записывает пачку пар (ключ, Checkpoint)."""
+        raise NotImplementedError
+
+    def _commit(self, items, messages, delivered):
+        """Записывает пачку состояний, сообщений и отметок об отправке."""
+        if items:
+            self._write(items)
+
+    def pending_messages(self, accept=None):
+        """Возвращает записанные, но не отправленные сообщения."""
+        return []
+
+    def save(self, key, checkpoint, messages=()):
+        """Кладёт состояние в буфер и сбрасывает его при переполнении."""
+        with self._lock:
+            self._pending[key] = checkpoint
+            self._outbox.extend(messages)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def mark_delivered(self, message_id):
+        """Отмечает сообщение отправленным; запись идёт со следующей пачкой."""
+        with self._lock:
+            self._delivered.add(message_id)
+
+    def maybe_flush(self):
+        """Сбрасывает буфер, если с прошлой записи прошло flush_interval."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные состояния одной пачкой.
+
+        Буферы очищаются только после успешной записи: если она упала,
+        пачка останется в них и уйдёт со следующим flush().
+        """
+        with self._lock:
+            pending = self._pending
+            messages = self._outbox
+            delivered = self._delivered
+            self._last_flush = time.monotonic()
+            if pending or messages or delivered:
+                self._commit(list(pending.items()), messages, delivered)
+                logging.debug('Сохранено состояний: %d', len(pending))
+            self._pending, self._outbox, self._delivered = {}, [], set()
+        # Отправка начинается только после того, как пачка записана.
+        if messages and self.on_commit is not None:
+            self.on_commit(messages)
+
+    def close(self):
+        """Сбрасывает буфер и освобождает ресурсы."""
+        self.flush()
+
+
+class NullCheckpointStore(CheckpointStore):
+    """Хранилище, которое ничего не сохраняет."""
+
+    def load_all(self):
+        """Возвращает пустой словарь."""
+        return {}
+
+    def _write(self, items):
+        """Отбрасывает записи."""
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Хранилище состояний в SQLite в режиме WAL.
+
+    Состояния, новые сообщения исходящей очереди и удаление отправленных
+    пишутся одной транзакцией на пачку, то есть одним fsync.
+    """
+
+    durable_outbox = True
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            'key TEXT PRIMARY KEY, timestamp INTEGER, '
+            'status TEXT, message TEXT, snapshot TEXT)'
+        )
+        columns = {
+            row[1] for row in
+            self.connection.execute('PRAGMA table_info(checkpoints)')
+        }
+        if 'snapshot' not in columns:
+            self.connection.execute(
+                'ALTER TABLE checkpoints ADD COLUMN snapshot TEXT'
+            )
+        # Без типа у chat_id числовой id чата остаётся числом.
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox '
+            '(id TEXT PRIMARY KEY, key TEXT, chat_id, text TEXT)'
+        )
+        self.connection.commit()
+
+    def load_all(self):
+        """Читает все состояния одним запросом."""
+        rows = self.connection.execute(
+            'SELECT key, timestamp, status, message, snapshot FROM checkpoints'
+        )
+        return {
+            key: Checkpoint(
+                timestamp, status, message,
+                json.loads(snapshot) if snapshot else None,
+            )
+            for key, timestamp, status, message, snapshot in rows
+        }
+
+    def pending_messages(self, accept=None):
+        """Читает неотправленные сообщения в порядке постановки.
+
+        accept отбирает ключи пользователей этого процесса: рабочие
+        процессы супервизора делят один файл, и каждый досылает только
+        сообщения своих пользователей.
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT id, key, chat_id, text FROM outbox ORDER BY rowid'
+            ).fetchall()
+            # Отправленные, но ещё не удалённые пачкой, не повторяются.
+            return [
+                OutboxMessage(*row) for row in rows
+                if row[0] not in self._delivered
+                and (accept is None or accept(row[1]))
+            ]
+
+    def _commit(self, items, messages, delivered):
+        """Пишет состояния и исходящую очередь в одной транзакции."""
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO checkpoints '
+                '(key, timestamp, status, message, snapshot) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [
+                    (
+                        key, *checkpoint[:-1],
+                        json.dumps(checkpoint.snapshot, ensure_ascii=False)
+                        if checkpoint.snapshot else None,
+                    )
+                    for key, checkpoint in items
+                ],
+            )
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO outbox (id, key, chat_id, text) '
+                'VALUES (?, ?, ?, ?)',
+                messages,
+            )
+            self.connection.executemany(
+                'DELETE FROM outbox WHERE id = ?',
+                [(message_id,) for message_id in delivered],
+            )
+
+    def _write(self, items):
+        """Обновляет пачку состояний в одной транзакции."""
+        self._commit(items, (), ())
+
+    def close(self):
+        """Сбрасывает буфер и закрывает соединение."""
+        super().close()
+        self.connection.close()
+
+
+class LogCheckpointStore(CheckpointStore):
+    """Хранилище состояний в журнале JSON строк, только дозапись.
+
+    При загрузке последняя запись ключа побеждает. Когда журнал
+    разрастается в LOG_COMPACT_RATIO раз больше числа ключей, он
+    переписывается заново.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._state = self._replay()
+        self._records = len(self._state)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        """Восстанавливает состояние из журнала."""
+        state = {}
+        if not os.path.exists(self.path):
+            return state
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    key, *values = json.loads(line)
+                except ValueError:
+                    logging.warning('Пропущена битая запись: %r', line)
+                    continue
+                state[key] = Checkpoint(*values)
+        return state
+
+    def load_all(self):
+        """Возвращает состояние, восстановленное из журнала."""
+        return dict(self._state)
+
+    def _write(self, items):
+        """Дописывает пачку записей и делает один fsync."""
+        self._file.write(''.join(
+            json.dumps([key, *checkpoint], ensure_ascii=False) + '\n'
+            for key, checkpoint in items
+        ))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._state.update(items)
+        self._records += len(items)
+        if self._records > LOG_COMPACT_RATIO * len(self._state):
+            self.compact()
+
+    def compact(self):
+        """Переписывает журнал, оставляя по одной записи на ключ."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            for key, checkpoint in self._state.items():
+                file.write(
+                    json.dumps([key, *checkpoint], ensure_ascii=False) + '\n'
+                )
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._records = len(self._state)
+
+    def close(self):
+        """Сбрасывает буфер и закрывает журнал."""
+        super().close()
+        self._file.close()
+
+
+BACKENDS = {
+    'sqlite': SQLiteCheckpointStore,
+    'log': LogCheckpointStore,
+}
+
+
+def open_store(path=CHECKPOINT_PATH, backend=CHECKPOINT_BACKEND):
+    """Открывает хранилище состояний, без пути — пустое."""
+    if not path:
+        return NullCheckpointStore()
+    if backend not in BACKENDS:
+        raise ValueError(f'Неизвестное хранилище состояний: {backend}')
+    return BACKENDS[backend](path)
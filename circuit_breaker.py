@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from http import HTTPStatus
+
+from config import getenv
+from exception import (
+    RequestUnclear,
+    ResponseCodeNotCorrect,
+    UnexpectedServerError,
+)
+
+BREAKER_THRESHOLD = int(getenv('BREAKER_THRESHOLD', 5))
+BREAKER_BASE_DELAY = float(getenv('BREAKER_BASE_DELAY', 30))
+BREAKER_MAX_DELAY = float(getenv('BREAKER_MAX_DELAY', 1800))
+BREAKER_JITTER = 0.2
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_outage(error):
+    """Проверяет, говорит ли ошибка о сбое API, а не о данных пользователя.
+
+    Неверный токен одного пользователя (401) или его некорректный ответ
+    не должны останавливать опрос остальных.
+    """
+    if isinstance(error, (RequestUnclear, UnexpectedServerError)):
+        return True
+    if isinstance(error, ResponseCodeNotCorrect):
+        code = error.status_code
+        return (
+            code is None
+            or code >= HTTPStatus.INTERNAL_SERVER_ERROR
+            or code == HTTPStatus.TOO_MANY_REQUESTS
+        )
+    return False
+
+
+class CircuitBreaker:
+    """Общий для всех пользователей предохранитель запросов к API.
+
+    После threshold сбоев подряд предохранитель размыкается, и запросы
+    не отправляются delay секунд. Затем пропускается один пробный запрос:
+    успех замыкает цепь, сбой снова размыкает её с удвоенной паузой до
+    max_delay. Пауза размывается на ±jitter.
+
+    record_failure() возвращает True, когда начался сбой, а
+    record_success() — когда он закончился: по этим переходам отправляется
+    одно общее уведомление вместо сообщения каждому пользователю.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD,
+                 base_delay=BREAKER_BASE_DELAY, max_delay=BREAKER_MAX_DELAY,
+                 jitter=BREAKER_JITTER, clock=time.monotonic, rng=None):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        """Возвращает паузу размыкания с учётом числа попыток."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.trips - 1))
+        spread = delay * self.jitter
+        return delay + self.rng.uniform(-spread, spread)
+
+    def allow(self):
+        """Разрешает запрос; в полуоткрытом состоянии — только один."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() < self.opened_until:
+                    return False
+                self.state = HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_after(self):
+        """Возвращает секунды до следующей попытки запроса."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.opened_until - self.clock())
+
+    def record_success(self):
+        """Учитывает успешный запрос; True — сбой закончился."""
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probing = False
+            return recovered
+
+    def record_failure(self):
+        """Учитывает сбой API; True — цепь только что разомкнулась."""
+        with self._lock:
+            self.failures += 1
+            if self.state == CLOSED and self.failures < self.threshold:
+                return False
+            # Запросы, ушедшие до размыкания, паузу не продлевают.
+            if self.state == OPEN:
+                return False
+            started = self.state == CLOSED
+            self.trips += 1
+            self.state = OPEN
+            self.opened_until = self.clock() + self._delay()
+            self._probing = False
+            return started
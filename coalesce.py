@@ -0,0 +1,54 @@
+import threading
+
+import metrics
+
+
+class _Call:
+    """Запрос в полёте и его итог."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом в один.
+
+    Первый вызов do() с ключом выполняет функцию, остальные, пришедшие
+    до её завершения, ждут и получают тот же результат или то же
+    исключение. Завершённые вызовы не запоминаются: это не кэш.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, function):
+        """Выполняет function или присоединяется к вызову в полёте."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            metrics.COALESCED_POLLS.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,124 @@
+import logging
+import math
+import time
+from collections import defaultdict
+
+from telegram.ext import CommandHandler, Updater
+
+from config import getenv
+from homework import MESSAGES, convert_time
+
+# Адрес, на который Telegram отправляет обновления; пусто — long polling.
+WEBHOOK_URL = getenv('TELEGRAM_WEBHOOK_URL')
+WEBHOOK_LISTEN = getenv('TELEGRAM_WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(getenv('TELEGRAM_WEBHOOK_PORT', 8443))
+# Потоки обработки команд: отдельно от пула опроса API.
+COMMAND_WORKERS = int(getenv('COMMAND_WORKERS', 2))
+COMMANDS = ('status', 'history', 'mute', 'unmute')
+# Наибольший срок /mute в часах; дольше — до /unmute.
+MUTE_MAX_HOURS = 24 * 365
+MUTE_USAGE = (
+    f'Использование: /mute [часы], больше 0 и не больше {MUTE_MAX_HOURS}'
+)
+
+
+class CommandService:
+    """Отвечает на команды пользователей по состоянию в памяти.
+
+    Ответы строятся из снимков статусов и истории пользователей и не
+    запрашивают API, поэтому нагрузка командами не меняет частоту
+    опроса. Ответы уходят через bot — обычно очередь отправки, с её
+    лимитами.
+    """
+
+    def __init__(self, tenants, bot, clock=time.time):
+        self.bot = bot
+        self.clock = clock
+        self.reload(tenants)
+
+    def reload(self, tenants):
+        """Перестраивает указатель чатов по новому списку пользователей."""
+        chats = defaultdict(list)
+        for tenant in tenants:
+            chats[str(tenant.chat_id)].append(tenant)
+        # Потоки команд читают указатель, поэтому он заменяется целиком.
+        self.tenants = chats
+
+    def status(self, chat_id, args=()):
+        """Возвращает последние известные статусы работ чата."""
+        lines = []
+        for tenant in self.tenants[chat_id]:
+            snapshot = tenant.snapshot
+            for key, status in list(snapshot.statuses.items()):
+                verdict = MESSAGES.verdict(status, tenant.locale)
+                lines.append(f'"{snapshot.name(key)}": {verdict}')
+        return '\n'.join(lines) or 'Статусов работ пока нет'
+
+    def history(self, chat_id, args=()):
+        """Возвращает последние изменения статусов работ чата."""
+        changes = sorted(
+            change
+            for tenant in self.tenants[chat_id]
+            for change in list(tenant.history)
+        )
+        lines = [
+            f'{convert_time(timestamp)} "{name}": {status}'
+            for timestamp, name, status in changes
+        ]
+        return '\n'.join(lines) or 'Изменений статусов пока не было'
+
+    def mute(self, chat_id, args=()):
+        """Отключает уведомления на args[0] часов или до /unmute."""
+        try:
+            hours = float(args[0]) if args else math.inf
+        except ValueError:
+            return MUTE_USAGE
+        if args and not 0 < hours <= MUTE_MAX_HOURS:
+            # Отрицательный, бесконечный или nan срок ничего не отключил
+            # бы или не превратился бы в дату.
+            return MUTE_USAGE
+        until = self.clock() + hours * 3600
+        for tenant in self.tenants[chat_id]:
+            tenant.muted_until = until
+        if math.isinf(until):
+            return 'Уведомления отключены до команды /unmute'
+        return f'Уведомления отключены до {convert_time(until)}'
+
+    def unmute(self, chat_id, args=()):
+        """Включает уведомления."""
+        for tenant in self.tenants[chat_id]:
+            tenant.muted_until = 0
+        return 'Уведомления включены'
+
+    def handle(self, command, chat_id, args=()):
+        """Выполняет команду и отправляет ответ в чат."""
+        if chat_id not in self.tenants:
+            return
+        self.bot.send_message(chat_id, getattr(self, command)(chat_id, args))
+
+    def attach(self, dispatcher):
+        """Регистрирует обработчики команд в диспетчере Telegram."""
+        for command in COMMANDS:
+            dispatcher.add_handler(CommandHandler(
+                command,
+                lambda update, context, command=command: self.handle(
+                    command, str(update.effective_chat.id), context.args
+                ),
+            ))
+
+
+def start_commands(token, service, webhook_url=WEBHOOK_URL):
+    """Запускает приём команд: webhook, если задан адрес, иначе опрос."""
+    updater = Updater(token=token, workers=COMMAND_WORKERS)
+    service.attach(updater.dispatcher)
+    if webhook_url:
+        updater.start_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=token,
+            webhook_url=f'{webhook_url.rstrip("/")}/{token}',
+        )
+    else:
+        updater.start_polling()
+    logging.info('Приём команд Telegram запущен')
+    return updater
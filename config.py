@@ -0,0 +1,8 @@
+import os
+
+from dotenv import load_dotenv
+
+# Файл .env читается один раз, при первом импорте этого модуля.
+load_dotenv()
+
+getenv = os.getenv
@@ -0,0 +1,182 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import metrics
+from config import getenv
+from exception import RequestTimeout
+
+# Ожидание соединения и паузы между байтами ответа API, секунды.
+API_CONNECT_TIMEOUT = float(getenv('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(getenv('API_READ_TIMEOUT', 10))
+# Сколько секунд может занять запрос к API за цикл опроса вместе с
+# повторами, 0 — без ограничения.
+CYCLE_BUDGET = float(getenv('CYCLE_BUDGET', 30))
+# Повторять ли запрос, который не ответил за HEDGE_QUANTILE задержек.
+API_HEDGE = getenv('API_HEDGE', '0') == '1'
+HEDGE_QUANTILE = 0.95
+# Сколько запросов нужно увидеть, прежде чем доверять квантилю.
+HEDGE_MIN_SAMPLES = 100
+# Потоков пула по умолчанию; пул опроса задаётся open_hedger().
+HEDGE_WORKERS = int(getenv('HEDGE_WORKERS', 32))
+
+_deadline = contextvars.ContextVar('deadline', default=None)
+_hedger = None
+
+
+@contextmanager
+def budget(seconds=CYCLE_BUDGET):
+    """Ограничивает запросы к API внутри блока seconds секундами."""
+    if not seconds:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Возвращает остаток бюджета в секундах или None без бюджета."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def request_timeout(connect=API_CONNECT_TIMEOUT, read=API_READ_TIMEOUT):
+    """Возвращает таймауты requests, урезанные до остатка бюджета."""
+    left = remaining()
+    if left is None:
+        return connect, read
+    if left <= 0:
+        metrics.API_TIMEOUTS.inc()
+        raise RequestTimeout('Бюджет цикла на запрос к API исчерпан')
+    return min(connect, left), min(read, left)
+
+
+def cancel(futures):
+    """Отменяет ещё не начатые попытки."""
+    for future in futures:
+        future.cancel()
+
+
+class Hedger:
+    """Выполняет запрос с ограничением по бюджету и страховочным повтором.
+
+    С бюджетом запрос идёт в отдельном потоке, а вызывающий ждёт не
+    дольше остатка бюджета: зависший сокет держит поток пула, но не
+    цикл опроса. С enabled, если ответа нет дольше квантиля quantile
+    задержек latency, отправляется второй такой же запрос, и побеждает
+    первый успешный. Так хвост задержек обрезается ценой примерно
+    (1 - quantile) лишних запросов. В latency пишется длительность
+    каждой попытки, а не вызова целиком: иначе повторы занижали бы
+    квантиль, и повторов становилось бы всё больше.
+    """
+
+    def __init__(self, enabled=API_HEDGE, latency=metrics.API_LATENCY,
+                 quantile=HEDGE_QUANTILE, min_samples=HEDGE_MIN_SAMPLES,
+                 workers=HEDGE_WORKERS):
+        self.enabled = enabled
+        self.latency = latency
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Возвращает паузу перед повтором или None, если повтора нет."""
+        if not self.enabled or self.latency.count() < self.min_samples:
+            return None
+        return self.latency.quantile(self.quantile)
+
+    def _attempt(self, function):
+        """Выполняет одну попытку и записывает её задержку."""
+        with self.latency.time():
+            return function()
+
+    def _submit(self, function):
+        """Запускает function в пуле с контекстом вызывающего потока."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='hedge'
+                )
+        # Один контекст нельзя войти из двух потоков сразу.
+        return self._executor.submit(
+            contextvars.copy_context().run, self._attempt, function
+        )
+
+    def _wait(self, futures, timeout=None):
+        """Ждёт первый из запросов, но не дольше остатка бюджета."""
+        left = remaining()
+        if left is not None:
+            timeout = max(0, left if timeout is None else min(timeout, left))
+        done, pending = wait(futures, timeout, FIRST_COMPLETED)
+        if not done and left is not None and remaining() <= 0:
+            # Ждущие в очереди пула попытки уже никому не нужны.
+            cancel(pending)
+            metrics.API_TIMEOUTS.inc()
+            raise RequestTimeout('Запрос к API не уложился в бюджет цикла')
+        return done, pending
+
+    def close(self):
+        """Останавливает пул, отменяя не начатые попытки."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def call(self, function):
+        """Возвращает результат первого успешного вызова function."""
+        delay = self.delay()
+        if delay is None and remaining() is None:
+            return self._attempt(function)
+        pending = {self._submit(function)}
+        if delay is not None:
+            done, pending = self._wait(pending, delay)
+            if not done:
+                metrics.HEDGED_REQUESTS.inc()
+                pending.add(self._submit(function))
+            pending |= done
+        error = None
+        while pending:
+            done, pending = self._wait(pending)
+            for future in done:
+                if future.exception() is None:
+                    cancel(pending)
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+
+def install_hedger(hedger):
+    """Делает исполнителя общим для всех запросов к API."""
+    global _hedger
+    _hedger = hedger
+
+
+def open_hedger(concurrency):
+    """Возвращает исполнителя для concurrency одновременных опросов.
+
+    Каждый опрос может держать запрос и его страховочный повтор, поэтому
+    потоков нужно вдвое больше, чем опросов.
+    """
+    return Hedger(workers=max(HEDGE_WORKERS, 2 * concurrency))
+
+
+def get_hedger():
+    """Возвращает установленного исполнителя, создавая его при нужде."""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger
+
+
+def call(function):
+    """Выполняет запрос через установленного исполнителя."""
+    return get_hedger().call(function)
@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+import metrics
+from config import getenv
+from lazy import lazy_import
+from log_pipeline import Truncated
+
+# Загружается первым созданием бота, а не импортом очереди.
+telegram = lazy_import('telegram')
+
+# Ограничения Telegram: около 30 сообщений в секунду на бота
+# и не чаще одного сообщения в секунду в один чат.
+GLOBAL_RATE = float(getenv('TELEGRAM_GLOBAL_RATE', 30))
+CHAT_RATE = float(getenv('TELEGRAM_CHAT_RATE', 1))
+DELIVERY_WORKERS = int(getenv('DELIVERY_WORKERS', 4))
+MAX_RETRIES = 5
+RETRY_BACKOFF = 1.0
+# telegram.constants.MAX_MESSAGE_LENGTH без загрузки telegram.
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = '\n\n'
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, now=None):
+        """Забирает токен и возвращает, сколько секунд ждать до его выдачи."""
+        with self._lock:
+            now = self.clock() if now is None else now
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def is_permanent(error):
+    """Проверяет, бессмысленен ли повтор отправки после ошибки."""
+    return isinstance(
+        error, (telegram.error.BadRequest, telegram.error.Unauthorized)
+    )
+
+
+def merge_messages(texts):
+    """Склеивает сообщения в одно в пределах лимита длины Telegram.
+
+    Возвращает склеенный текст и сообщения, которые в него не влезли.
+    """
+    merged = texts[0][:MAX_MESSAGE_LENGTH]
+    limit = MAX_MESSAGE_LENGTH - len(MERGE_SEPARATOR)
+    for index, text in enumerate(texts[1:], start=1):
+        if len(merged) + len(text) > limit:
+            return merged, texts[index:]
+        merged += MERGE_SEPARATOR + text
+    return merged, []
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений с рабочими потоками.
+
+    Повторяет интерфейс bot.send_message, поэтому её можно передать в
+    send_message вместо бота: вызов лишь кладёт сообщение в очередь и
+    сразу возвращается. Рабочие потоки соблюдают общий лимит и лимит на
+    чат, склеивают накопившиеся сообщения одного чата в одно и повторяют
+    отправку при telegram.TelegramError. Необязательный done вызывается
+    с True, когда сообщение отправлено или окончательно отклонено, и с
+    False, когда повторы исчерпаны.
+    """
+
+    def __init__(self, bot, workers=DELIVERY_WORKERS,
+                 global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        # Время последней попытки отправки в чат, по нему считается
+        # лимит чата.
+        self._sent_at = {}
+        self._pending = {}
+        self._ready = []
+        self._in_flight = set()
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = []
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(items) for items in self._pending.values())
+
+    def start(self):
+        """Запускает рабочие потоки."""
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'delivery-{number}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def send_message(self, chat_id, text, done=None):
+        """Ставит сообщение в очередь на отправку."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Очередь отправки закрыта')
+            items = self._pending.setdefault(chat_id, [])
+            items.append((text, done))
+            if len(items) == 1 and chat_id not in self._in_flight:
+                self._schedule(chat_id)
+
+    def _schedule(self, chat_id):
+        """Ставит чат в очередь готовности с учётом лимита чата.
+
+        Срок считается от фактической отправки, а не от постановки в
+        очередь: ожидание общего лимита и пробуждение потока не должны
+        сокращать паузу между сообщениями одного чата.
+        """
+        sent_at = self._sent_at.get(chat_id)
+        not_before = time.monotonic()
+        if sent_at is not None:
+            not_before = max(not_before, sent_at + 1 / self.chat_rate)
+        heapq.heappush(
+            self._ready, (not_before, next(self._counter), chat_id)
+        )
+        self._cond.notify()
+
+    def _take(self):
+        """Ждёт чат, которому пора отправлять, и забирает его сообщения."""
+        with self._cond:
+            while True:
+                if self._ready:
+                    delay = self._ready[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                elif self._closed:
+                    return None, None, None
+                else:
+                    delay = None
+                self._cond.wait(delay)
+            _, _, chat_id = heapq.heappop(self._ready)
+            items = self._pending.pop(chat_id)
+            merged, rest = merge_messages([text for text, _ in items])
+            taken = len(items) - len(rest)
+            if rest:
+                self._pending[chat_id] = items[taken:]
+            self._in_flight.add(chat_id)
+            callbacks = [done for _, done in items[:taken] if done]
+            return chat_id, merged, callbacks
+
+    def _release(self, chat_id):
+        """Снимает отметку отправки и планирует оставшиеся сообщения."""
+        with self._cond:
+            self._in_flight.discard(chat_id)
+            if chat_id in self._pending:
+                self._schedule(chat_id)
+            self._cond.notify_all()
+
+    def _deliver(self, chat_id, text):
+        """Отправляет сообщение, повторяя при временных ошибках.
+
+        Возвращает False, только если исчерпаны повторы: отклонённое
+        Telegram сообщение повторять бессмысленно.
+        """
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.global_bucket.reserve())
+            # Чат в отправке, поэтому время пишет только этот поток.
+            self._sent_at[chat_id] = time.monotonic()
+            try:
+                with metrics.DELIVERY_LATENCY.time():
+                    self.bot.send_message(chat_id, text)
+                return True
+            except telegram.error.RetryAfter as error:
+                delay = error.retry_after
+            except telegram.TelegramError as error:
+                if is_permanent(error):
+                    logging.error(
+                        'Сообщение в %s отклонено: %s', chat_id, error
+                    )
+                    return True
+                delay = self.retry_backoff * 2 ** attempt
+                logging.warning(
+                    'Ошибка отправки в %s, попытка %d: %s',
+                    chat_id, attempt + 1, error,
+                )
+            time.sleep(delay)
+        logging.error(
+            'Сообщение в %s не доставлено: %s', chat_id, Truncated(text)
+        )
+        return False
+
+    def _work(self):
+        """Цикл рабочего потока."""
+        while True:
+            chat_id, text, callbacks = self._take()
+            if callbacks is None:
+                return
+            finished = False
+            try:
+                finished = self._deliver(chat_id, text)
+            except Exception as error:
+                logging.error('Сбой отправки в %s: %s', chat_id, error,
+                              exc_info=True)
+            finally:
+                self._release(chat_id)
+            for done in callbacks:
+                done(finished)
+
+    def join(self, timeout=None):
+        """Ждёт, пока очередь опустеет. Возвращает False по таймауту."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Дожидается отправки очереди и останавливает рабочие потоки."""
+        drained = self.join(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        return drained
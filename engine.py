@@ -0,0 +1,683 @@
+import asyncio
+import hashlib
+import logging
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import deadline
+import history_log
+import log_pipeline
+import metrics
+from checkpoint import Checkpoint, NullCheckpointStore, make_key, open_store
+from circuit_breaker import CLOSED, CircuitBreaker, is_outage
+from coalesce import SingleFlight
+from config import getenv
+from delivery import DeliveryQueue
+from homework import (
+    RETRY_PERIOD,
+    check_response,
+    current_tenant,
+    get_api_answer,
+    last_status,
+    notify_changes,
+    send_message,
+)
+from history_log import open_log
+from http_cache import ResponseCache, Unchanged
+from lazy import lazy_import
+from outbox import open_outbox
+from polling_policy import AdaptivePolicy
+from scheduler import PollScheduler
+from shutdown import SHUTDOWN
+from status_diff import StatusSnapshot, intern_status
+from tenant_config import ConfigWatcher, load_config
+
+# Рабочие процессы супервизора загружают telegram и requests при первом
+# запросе, а не при импорте.
+telegram = lazy_import('telegram')
+http_session = lazy_import('http_session')
+
+TELEGRAM_TOKEN = getenv('TELEGRAM_TOKEN')
+TENANTS_FILE = getenv('TENANTS_FILE', 'tenants.json')
+# Чат для общих уведомлений о сбоях API, пусто — только в лог.
+OUTAGE_CHAT_ID = getenv('OUTAGE_CHAT_ID')
+POLL_CONCURRENCY = int(getenv('POLL_CONCURRENCY', 64))
+# Наибольшая пауза цикла планировщика, секунды.
+SCHEDULER_TICK = 1
+# Сколько последних изменений статусов помнить для /history.
+HISTORY_LIMIT = 20
+
+
+def fingerprint(text):
+    """Возвращает 64-битный отпечаток текста сообщения."""
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def load_fingerprint(value):
+    """Читает отпечаток из контрольной точки.
+
+    Старые контрольные точки хранят сам текст сообщения.
+    """
+    if not value:
+        return 0
+    if len(value) == 16:
+        try:
+            return int(value, 16)
+        except ValueError:
+            pass
+    return fingerprint(value)
+
+
+class Tenant:
+    """Пара токен Практикума и chat_id с состоянием опроса.
+
+    В одном процессе живут сотни тысяч пользователей, поэтому запись
+    компактная: __slots__ вместо __dict__, заголовки запроса строятся по
+    требованию, статусы — общие интернированные строки, а от последних
+    сообщений хранятся только 64-битные отпечатки. История изменений —
+    короткий список, а не deque: пустой deque весит 600 байт.
+    """
+
+    __slots__ = (
+        'token', 'chat_id', 'locale', 'key', 'timestamp',
+        'message_fingerprint', 'error_fingerprint', 'snapshot', 'status',
+        'interval', 'interval_status', 'history', 'muted_until',
+    )
+
+    def __init__(self, token, chat_id, timestamp=None, locale=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.locale = locale
+        self.key = make_key(token, chat_id)
+        self.timestamp = (
+            int(time.time()) if timestamp is None else timestamp
+        )
+        self.message_fingerprint = 0
+        self.error_fingerprint = 0
+        self.snapshot = StatusSnapshot()
+        self.status = None
+        self.interval = 0
+        self.interval_status = None
+        self.history = []
+        self.muted_until = 0
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API с токеном пользователя."""
+        return {'Authorization': f'OAuth {self.token}'}
+
+    @property
+    def muted(self):
+        """Отключены ли уведомления пользователя командой /mute."""
+        return time.time() < self.muted_until
+
+    def __repr__(self):
+        return f'Tenant(chat_id={self.chat_id})'
+
+    def record_cycle(self, message, status):
+        """Запоминает итог цикла: последнее сообщение и статус."""
+        if message:
+            self.message_fingerprint = fingerprint(message)
+        if status:
+            self.status = intern_status(status)
+        del self.history[:-HISTORY_LIMIT]
+
+    def record_error(self, message):
+        """Запоминает ошибку; False — о ней уже сообщалось."""
+        error = fingerprint(message)
+        if error == self.error_fingerprint:
+            return False
+        self.error_fingerprint = error
+        return True
+
+    def restore(self, checkpoint):
+        """Восстанавливает состояние опроса из контрольной точки."""
+        self.timestamp, status, message, snapshot = checkpoint
+        self.status = intern_status(status)
+        self.message_fingerprint = load_fingerprint(message)
+        self.snapshot = StatusSnapshot.load(snapshot)
+
+    def checkpoint(self):
+        """Возвращает контрольную точку состояния опроса."""
+        message = self.message_fingerprint
+        return Checkpoint(
+            self.timestamp, self.status, f'{message:016x}' if message else '',
+            self.snapshot.dump(),
+        )
+
+
+def make_tenants(records, locales=None):
+    """Создаёт пользователей по записям конфигурации."""
+    # JSON создаёт новую строку языка для каждой записи, а языков
+    # всего несколько.
+    locales = {} if locales is None else locales
+    return [
+        Tenant(
+            record.token, record.chat_id,
+            locale=locales.setdefault(record.locale, record.locale),
+        )
+        for record in records
+    ]
+
+
+def load_tenants(path):
+    """Загружает список пользователей из JSON файла."""
+    return make_tenants(load_config(path).tenants.values())
+
+
+def notify_outage(bot, message):
+    """Отправляет общее уведомление о сбое API."""
+    logging.critical(message)
+    if not OUTAGE_CHAT_ID:
+        return
+    try:
+        bot.send_message(OUTAGE_CHAT_ID, message)
+    except telegram.TelegramError as error:
+        logging.error('Ошибка отправки уведомления о сбое: %s', error)
+
+
+def track_outage(bot, breaker, error=None):
+    """Учитывает исход запроса предохранителем; True — это сбой API.
+
+    Ошибки пользователя, например неверный токен, означают, что API
+    ответило, и считаются успехом.
+    """
+    if breaker is None:
+        return False
+    if error is not None and is_outage(error):
+        if breaker.record_failure():
+            notify_outage(
+                bot,
+                f'API Практикума недоступно ({type(error).__name__}), '
+                f'опрос приостановлен на {breaker.retry_after():.0f} с',
+            )
+        return True
+    if breaker.record_success():
+        notify_outage(bot, 'API Практикума снова доступно')
+    return False
+
+
+def fetch_answer(tenant, cache=None, flight=None, from_date=None):
+    """Запрашивает ответ API для пользователя.
+
+    С flight одновременные запросы с тем же токеном и from_date
+    объединяются в один. from_date задаёт общую для подписчиков токена
+    дату запроса вместо даты чата. Кэш ответов тогда не используется:
+    Unchanged говорит о прошлом ответе одного чата, а не всех подписчиков
+    токена.
+    """
+    with deadline.budget():
+        if flight is not None:
+            if from_date is None:
+                from_date = tenant.timestamp
+            return flight.do(
+                (tenant.token, from_date),
+                partial(get_api_answer, from_date),
+            )
+        if cache is not None:
+            return cache.get_api_answer(tenant.timestamp)
+        return get_api_answer(tenant.timestamp)
+
+
+def run_cycle(bot, tenant, cache=None, breaker=None, flight=None,
+              from_date=None):
+    """Выполняет один цикл опроса API для пользователя.
+
+    С breaker сбои API учитываются предохранителем, и вместо сообщения
+    каждому пользователю отправляется одно уведомление о начале и конце
+    сбоя.
+    """
+    started = time.monotonic()
+    try:
+        response = fetch_answer(tenant, cache, flight, from_date)
+        track_outage(bot, breaker)
+        if isinstance(response, Unchanged):
+            tenant.timestamp = response.current_date or tenant.timestamp
+            logging.debug('Ответ API не изменился для %s', tenant)
+            return
+        homeworks = check_response(response)
+        last_timestamp = tenant.timestamp
+        tenant.timestamp = response['current_date']
+        message = notify_changes(
+            bot, tenant.snapshot, homeworks, last_timestamp, tenant.timestamp,
+            muted=tenant.muted, history=tenant.history,
+        )
+        tenant.record_cycle(message, last_status(homeworks))
+    except Exception as error:
+        message_error = f'Сбой в работе программы: {error}'
+        logging.error('%s: %s', tenant, error, exc_info=True)
+        metrics.ERRORS.inc(exception=type(error).__name__)
+        if cache is not None:
+            cache.forget(tenant.headers['Authorization'])
+        if track_outage(bot, breaker, error):
+            return
+        if tenant.muted:
+            return
+        if tenant.record_error(message_error):
+            send_message(bot, message_error)
+    finally:
+        metrics.CYCLE_DURATION.observe(time.monotonic() - started)
+
+
+class PollingEngine:
+    """Опрашивает API для множества пользователей в одном процессе.
+
+    Число одновременных запросов ограничено concurrency: задача на
+    пользователя создаётся только после захвата семафора, поэтому память
+    растёт с числом запросов в полёте, а не с числом пользователей.
+
+    Чаты с общим токеном Практикума опрашиваются вместе: когда подходит
+    срок одного, опрашиваются и остальные, а их запросы объединяются в
+    один с самой ранней из их дат. Уже известные чату статусы отсекает
+    его снимок, а после общего ответа даты подписчиков совпадают.
+
+    После сигнала остановки новые опросы не начинаются, а начатые
+    доводятся до конца, пока не истечёт срок shutdown.
+
+    С watcher изменения файла пользователей применяются на ходу:
+    добавляются, удаляются и переносятся только затронутые пользователи.
+    on_reload получает новый список пользователей.
+
+    Сообщения цикла копятся в пачке outbox и, если хранилище это
+    поддерживает, записываются в исходящую очередь вместе с состоянием
+    пользователя, а отправляются уже после записи.
+    """
+
+    def __init__(self, bot, tenants, concurrency=POLL_CONCURRENCY,
+                 retry_period=RETRY_PERIOD, policy=None, store=None,
+                 cache=None, breaker=None, shutdown=SHUTDOWN, watcher=None,
+                 on_reload=None, outbox=None):
+        self.bot = bot
+        self.tenants = list(tenants)
+        self.by_key = {tenant.key: tenant for tenant in self.tenants}
+        self.concurrency = concurrency
+        self.retry_period = retry_period
+        self.policy = policy or AdaptivePolicy()
+        self.store = store or NullCheckpointStore()
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.shutdown = shutdown
+        self.watcher = watcher
+        self.on_reload = on_reload
+        self.outbox = outbox or open_outbox(
+            self.store, bot, queued=isinstance(bot, DeliveryQueue)
+        )
+        self.scheduler = PollScheduler()
+        self.flight = SingleFlight()
+        self.subscribers = self._group_subscribers()
+        self._group_dates = {}
+        self._semaphore = None
+        self._in_flight = set()
+
+    def _group_subscribers(self):
+        """Возвращает чаты токенов, на которые подписано больше одного."""
+        groups = defaultdict(list)
+        for tenant in self.tenants:
+            groups[tenant.token].append(tenant)
+        return {
+            token: group for token, group in groups.items() if len(group) > 1
+        }
+
+    def _join_group(self, tenant):
+        """Возвращает дату запроса подписчика токена на время его опроса.
+
+        Пока хоть один чат токена опрашивается, остальные запрашивают ту
+        же дату, иначе она заново берётся самой ранней среди чатов. Чат с
+        более ранней датой, чем у начатого опроса, запрашивает свою.
+        """
+        group = self._group_dates.get(tenant.token)
+        if group is None:
+            from_date = min(
+                other.timestamp for other in self.subscribers[tenant.token]
+            )
+            group = self._group_dates[tenant.token] = [from_date, 0]
+        group[1] += 1
+        return min(group[0], tenant.timestamp)
+
+    def _leave_group(self, tenant):
+        """Снимает подписчика токена с опроса."""
+        group = self._group_dates[tenant.token]
+        group[1] -= 1
+        if not group[1]:
+            del self._group_dates[tenant.token]
+
+    def next_delay(self, tenant):
+        """Возвращает паузу до следующего опроса пользователя."""
+        return self.policy.next_interval(tenant)
+
+    async def _poll(self, tenant):
+        """Запускает цикл пользователя в рабочем потоке."""
+        token = current_tenant.set(tenant)
+        shared = tenant.token in self.subscribers
+        from_date = self._join_group(tenant) if shared else None
+        batch = self.outbox.batch(tenant.key, tenant.timestamp)
+        try:
+            await asyncio.to_thread(
+                run_cycle, batch, tenant, self.cache, self.breaker,
+                self.flight if shared else None, from_date,
+            )
+            # Незавершённый цикл не сохраняется: после перезапуска он
+            # повторится, а его сообщения ещё не отправлены.
+            self.store.save(tenant.key, tenant.checkpoint(), batch.messages)
+        finally:
+            if shared:
+                self._leave_group(tenant)
+            current_tenant.reset(token)
+            self._semaphore.release()
+            # Пользователя могли удалить из файла, пока шёл его опрос.
+            if self.by_key.get(tenant.key) is tenant:
+                self.scheduler.add(tenant, self.next_delay(tenant))
+
+    def with_subscribers(self, due):
+        """Добавляет к наступившим срокам остальных подписчиков токена."""
+        for tenant in due:
+            yield tenant
+            for other in self.subscribers.get(tenant.token, ()):
+                if other is not tenant and self.scheduler.cancel(other):
+                    yield other
+
+    def defer(self, tenant):
+        """Переносит опрос, пока предохранитель не пропускает запросы."""
+        delay = max(SCHEDULER_TICK, self.breaker.retry_after())
+        self.scheduler.add(tenant, delay)
+
+    async def dispatch(self, tenant):
+        """Ставит опрос пользователя в работу, соблюдая лимит запросов."""
+        await self._semaphore.acquire()
+        if self.shutdown.requested:
+            # Остановку запросили, пока ждали свободного места.
+            self._semaphore.release()
+            return
+        task = asyncio.create_task(self._poll(tenant))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def drain(self):
+        """Дожидается завершения всех запросов в полёте."""
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+
+    async def stop(self):
+        """Доводит запросы в полёте до конца и сбрасывает состояние."""
+        self.shutdown.log_signal()
+        logging.info(
+            'Остановка опроса, запросов в полёте: %d', len(self._in_flight)
+        )
+        if self._in_flight:
+            _, pending = await asyncio.wait(
+                set(self._in_flight), timeout=self.shutdown.remaining()
+            )
+            if pending:
+                logging.warning(
+                    'Не дождались запросов: %d, их циклы повторятся после '
+                    'перезапуска', len(pending),
+                )
+        self.flush_store(self.store.flush)
+        history_log.flush()
+
+    def flush_store(self, flush):
+        """Сбрасывает буфер хранилища, не останавливая опрос при сбое.
+
+        Несохранённая пачка остаётся в буфере хранилища и уйдёт со
+        следующей попыткой.
+        """
+        try:
+            flush()
+        except Exception as error:
+            logging.error(
+                'Не удалось сохранить состояние: %s', error, exc_info=True
+            )
+
+    async def run_round(self):
+        """Опрашивает всех пользователей один раз."""
+        for tenant in self.tenants:
+            await self.dispatch(tenant)
+        await self.drain()
+
+    def restore(self, tenants=None):
+        """Восстанавливает состояние пользователей из хранилища."""
+        started = time.monotonic()
+        saved = self.store.load_all()
+        restored = 0
+        for tenant in self.tenants if tenants is None else tenants:
+            if tenant.key in saved:
+                tenant.restore(saved[tenant.key])
+                restored += 1
+        logging.info(
+            'Восстановлено состояний: %d за %.1f мс',
+            restored, (time.monotonic() - started) * 1000,
+        )
+
+    def start(self):
+        """Готовит семафор, пул потоков и метрики очередей."""
+        metrics.SCHEDULED_POLLS.set_function(lambda: len(self.scheduler))
+        metrics.IN_FLIGHT_POLLS.set_function(lambda: len(self._in_flight))
+        metrics.API_CIRCUIT_OPEN.set_function(
+            lambda: int(self.breaker.state != CLOSED)
+        )
+        if isinstance(self.bot, DeliveryQueue):
+            metrics.DELIVERY_QUEUE_DEPTH.set_function(
+                lambda: len(self.bot)
+            )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency)
+        )
+
+    def apply_config(self, config):
+        """Применяет новую конфигурацию, не трогая прочих пользователей.
+
+        Новые пользователи восстанавливаются из хранилища и получают
+        первый опрос в пределах retry_period, удалённые снимаются с
+        расписания. У оставшихся меняется только язык. Если изменились
+        интервалы опроса, переносятся лишь пользователи со статусом,
+        интервал которого стал другим.
+        """
+        removed = [
+            tenant for tenant in self.tenants
+            if tenant.key not in config.tenants
+        ]
+        for tenant in removed:
+            del self.by_key[tenant.key]
+            self.scheduler.cancel(tenant)
+            self.policy.forget(tenant)
+            if self.cache is not None:
+                self.cache.forget(tenant.headers['Authorization'])
+        locales = {tenant.locale: tenant.locale for tenant in self.tenants}
+        added = make_tenants(
+            (
+                record for key, record in config.tenants.items()
+                if key not in self.by_key
+            ),
+            locales,
+        )
+        for tenant in self.tenants:
+            record = config.tenants.get(tenant.key)
+            if record is not None and record.locale != tenant.locale:
+                tenant.locale = locales.setdefault(
+                    record.locale, record.locale
+                )
+        if removed:
+            self.tenants = [
+                tenant for tenant in self.tenants if tenant.key in self.by_key
+            ]
+        if added:
+            self.restore(added)
+            self.tenants.extend(added)
+            for tenant in added:
+                self.by_key[tenant.key] = tenant
+                self.scheduler.add(tenant, self.retry_period, spread=True)
+        self.subscribers = self._group_subscribers()
+        rescheduled = self._apply_intervals(config.intervals)
+        logging.info(
+            'Файл пользователей применён: добавлено %d, удалено %d, '
+            'перенесено %d', len(added), len(removed), rescheduled,
+        )
+        if self.on_reload is not None:
+            self.on_reload(self.tenants)
+
+    def _apply_intervals(self, intervals):
+        """Меняет интервалы опроса и переносит затронутых пользователей."""
+        current = self.policy.intervals
+        changed = {
+            status for status in set(current) | set(intervals)
+            if current.get(status) != intervals.get(status)
+        }
+        if not changed:
+            return 0
+        self.policy.intervals = intervals
+        rescheduled = 0
+        for tenant in self.tenants:
+            if tenant.status in changed and self.scheduler.cancel(tenant):
+                # Интервал считается заново от базового для статуса.
+                tenant.interval_status = None
+                self.scheduler.add(tenant, self.next_delay(tenant))
+                rescheduled += 1
+        return rescheduled
+
+    def reload(self):
+        """Применяет изменения файла пользователей, если они есть."""
+        if self.watcher is None:
+            return
+        config = self.watcher.poll()
+        if config is not None:
+            self.apply_config(config)
+
+    def recover_outbox(self):
+        """Досылает неотправленные сообщения пользователей процесса.
+
+        Рабочие процессы супервизора делят одно хранилище, поэтому
+        сообщения отбираются тем же фильтром ключей, что и пользователи
+        из файла.
+        """
+        accept = None if self.watcher is None else self.watcher.accept
+        self.outbox.recover(accept)
+
+    def _sleep_time(self):
+        """Возвращает паузу до ближайшего срока, но не больше тика."""
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            return SCHEDULER_TICK
+        return min(SCHEDULER_TICK, max(0, deadline - time.monotonic()))
+
+    async def run(self):
+        """Опрашивает пользователей по их срокам до сигнала остановки."""
+        self.start()
+        self.restore()
+        self.recover_outbox()
+        for tenant in self.tenants:
+            self.scheduler.add(tenant, self.retry_period, spread=True)
+        last_report = time.monotonic()
+        while not self.shutdown.requested:
+            for tenant in self.with_subscribers(self.scheduler.pop_due()):
+                if self.shutdown.requested:
+                    break
+                if self.breaker.allow():
+                    await self.dispatch(tenant)
+                else:
+                    self.defer(tenant)
+            self.flush_store(self.store.maybe_flush)
+            history_log.maybe_flush()
+            self.reload()
+            if time.monotonic() - last_report >= self.retry_period:
+                last_report = time.monotonic()
+                self.report()
+                # Сообщения, повторы которых исчерпаны, пробуются снова.
+                self.recover_outbox()
+            await asyncio.sleep(self._sleep_time())
+        await self.stop()
+
+    def report(self):
+        """Пишет в лог состояние очереди и пула соединений."""
+        logging.info(
+            'Пользователей: %d, в очереди: %d, в полёте: %d',
+            len(self.tenants), len(self.scheduler), len(self._in_flight),
+        )
+        if isinstance(self.bot, DeliveryQueue):
+            logging.info('Сообщений к отправке: %d', len(self.bot))
+        session = http_session.get_session()
+        if session is not None:
+            logging.info('Соединения с API: %s', session.stats)
+        if self.cache is not None:
+            logging.info('Кэш ответов API: %s', self.cache)
+        if self.subscribers:
+            logging.info(
+                'Токенов с несколькими чатами: %d, объединено запросов: %d',
+                len(self.subscribers), self.flight.shared,
+            )
+
+
+def check_telegram_token():
+    """Завершает процесс, если не задан токен Telegram."""
+    if not TELEGRAM_TOKEN:
+        exit_message = 'Отсутствует переменная окружения TELEGRAM_TOKEN'
+        logging.critical(exit_message)
+        sys.exit(exit_message)
+
+
+def serve(watcher, store, commands=True, history=None):
+    """Опрашивает пользователей, пока процесс не остановят.
+
+    Пользователи и интервалы опроса читаются из файла watcher, а его
+    изменения применяются на ходу. С commands в отдельных потоках
+    принимаются команды пользователей. history — открытый журнал
+    статусов, закрывается при остановке. По SIGTERM или SIGINT опрос
+    останавливается, очередь сообщений отправляется до конца, а
+    состояние пользователей сохраняется; на всё отводится
+    SHUTDOWN_TIMEOUT секунд.
+    """
+    SHUTDOWN.install()
+    config = watcher.load()
+    tenants = make_tenants(config.tenants.values())
+    logging.info('Пользователей: %d', len(tenants))
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    hedger = deadline.open_hedger(POLL_CONCURRENCY)
+    deadline.install_hedger(hedger)
+    # Соединений столько же, сколько потоков исполнителя: иначе
+    # страховочный повтор ждал бы свободного соединения.
+    http_session.install_session(
+        http_session.ManagedSession(pool_size=hedger.workers)
+    )
+    queue = DeliveryQueue(bot).start()
+    updater = None
+    on_reload = None
+    if commands:
+        # telegram.ext импортируется долго и нужен только приёму команд.
+        from commands import CommandService, start_commands
+        service = CommandService(tenants, queue)
+        on_reload = service.reload
+        updater = start_commands(TELEGRAM_TOKEN, service)
+    try:
+        asyncio.run(PollingEngine(
+            queue, tenants, store=store, cache=ResponseCache(),
+            policy=AdaptivePolicy(intervals=config.intervals),
+            watcher=watcher, on_reload=on_reload,
+        ).run())
+    finally:
+        if updater is not None:
+            updater.stop()
+        if not queue.close(timeout=SHUTDOWN.remaining()):
+            logging.error('Не отправлено сообщений: %d', len(queue))
+        store.close()
+        if history is not None:
+            history.close()
+
+
+def main():
+    """Запускает опрос для всех пользователей из файла."""
+    check_telegram_token()
+    metrics.start_server()
+    serve(ConfigWatcher(TENANTS_FILE), open_store(), history=open_log())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s, %(levelname)s, %(message)s',
+    )
+    log_pipeline.start_queue_logging()
+    main()
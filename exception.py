@@ -7,7 +7,9 @@ class UnexpectedServerError(Exception):
 class ResponseCodeNotCorrect(Exception):
     """Некорректный код ответа сервера."""
 
-    pass
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class RequestUnclear(Exception):
@@ -26,3 +28,15 @@ class UnknownTaskStatus(Exception):
     """Неизвестный статус задания."""
 
     pass
+
+
+class ShutdownRequested(BaseException):
+    """Процессу пришёл сигнал остановки во время ожидания."""
+
+    pass
+
+
+class RequestTimeout(RequestUnclear):
+    """Запрос к API не уложился в бюджет цикла опроса."""
+
+    pass
@@ -0,0 +1,275 @@
+import bisect
+import contextvars
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config import getenv
+
+HISTORY_PATH = getenv('HISTORY_PATH')
+# Сколько дней хранить события при сжатии, 0 — без ограничения.
+HISTORY_RETENTION_DAYS = float(getenv('HISTORY_RETENTION_DAYS', 0))
+FLUSH_INTERVAL = 1.0
+
+# Пользователь, работа, время, статус: 24 байта на событие.
+RECORD = struct.Struct('<QQIB3x')
+STATUSES = (None, 'reviewing', 'approved', 'rejected')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+MAX_TIMESTAMP = 2 ** 32 - 1
+
+Event = namedtuple('Event', ('tenant', 'homework', 'timestamp', 'status'))
+
+_log = None
+_deferred = contextvars.ContextVar('deferred_events', default=None)
+
+
+@lru_cache(maxsize=65536)
+def hash_id(value):
+    """Возвращает 64-битный идентификатор строки."""
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def homework_id(key):
+    """Возвращает числовой id работы, для названий — хеш."""
+    key = str(key)
+    if key.isdigit() and int(key) < 2 ** 64:
+        return int(key)
+    return hash_id(key)
+
+
+class HistoryLog:
+    """Журнал смен статусов работ из записей фиксированной длины.
+
+    Запись только дописывается в конец буферизованного файла, поэтому
+    append() стоит упаковки struct и копирования 24 байт. Чтение идёт
+    через mmap. Индекс в памяти хранит для каждого пользователя массивы
+    времён и номеров записей, так что выборка за интервал — это bisect и
+    чтение только нужных записей. compact() переписывает файл без старых
+    и повторяющихся событий.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        """Открывает файл на дозапись и строит индекс."""
+        self._file = open(self.path, 'ab')
+        self._count, tail = divmod(self._file.tell(), RECORD.size)
+        if tail:
+            # Запись, оборванная при падении, сдвинула бы все следующие.
+            self._file.truncate(self._count * RECORD.size)
+        self._last_flush = time.monotonic()
+        self._index = defaultdict(lambda: (array('I'), array('Q')))
+        for number, event in enumerate(self._scan()):
+            self._add_to_index(number, event[0], event[2])
+
+    def __len__(self):
+        return self._count
+
+    def _add_to_index(self, number, tenant, timestamp):
+        """Добавляет запись в индекс пользователя, сохраняя порядок."""
+        timestamps, numbers = self._index[tenant]
+        if not timestamps or timestamps[-1] <= timestamp:
+            timestamps.append(timestamp)
+            numbers.append(number)
+            return
+        position = bisect.bisect_right(timestamps, timestamp)
+        timestamps.insert(position, timestamp)
+        numbers.insert(position, number)
+
+    def _scan(self):
+        """Перебирает сырые записи файла через mmap."""
+        if not self._count:
+            return
+        with open(self.path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)[:self._count * RECORD.size]
+                records = RECORD.iter_unpack(view)
+                try:
+                    yield from records
+                finally:
+                    del records
+                    view.release()
+
+    def append(self, tenant_key, homework_key, status, timestamp):
+        """Дописывает событие смены статуса."""
+        tenant = hash_id(tenant_key)
+        timestamp = min(int(timestamp), MAX_TIMESTAMP)
+        record = RECORD.pack(
+            tenant, homework_id(homework_key), timestamp,
+            STATUS_CODES.get(status, 0),
+        )
+        with self._lock:
+            self._file.write(record)
+            self._add_to_index(self._count, tenant, timestamp)
+            self._count += 1
+
+    def maybe_flush(self):
+        """Сбрасывает буфер, если с прошлой записи прошло flush_interval."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает буфер файла на диск."""
+        with self._lock:
+            self._file.flush()
+            self._last_flush = time.monotonic()
+
+    def events(self, tenant_key, start=0, end=MAX_TIMESTAMP):
+        """Возвращает события пользователя с start <= время < end."""
+        self.flush()
+        with self._lock:
+            timestamps, numbers = self._index.get(
+                hash_id(tenant_key), ((), ())
+            )
+            low = bisect.bisect_left(timestamps, start)
+            high = bisect.bisect_left(timestamps, end)
+            selected = numbers[low:high]
+            if not len(selected):
+                return []
+            with open(self.path, 'rb') as file:
+                with mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as data:
+                    records = [
+                        RECORD.unpack_from(data, number * RECORD.size)
+                        for number in selected
+                    ]
+        return [
+            Event(tenant, homework, timestamp, STATUSES[code])
+            for tenant, homework, timestamp, code in records
+        ]
+
+    def review_durations(self, tenant_key):
+        """Возвращает {id работы: секунды в reviewing} по событиям."""
+        durations = defaultdict(int)
+        started = {}
+        for event in self.events(tenant_key):
+            since = started.pop(event.homework, None)
+            if since is not None:
+                durations[event.homework] += event.timestamp - since
+            if event.status == 'reviewing':
+                started[event.homework] = event.timestamp
+        return dict(durations)
+
+    def compact(self, retention=None, now=None):
+        """Переписывает журнал без старых и повторяющихся событий.
+
+        Последнее событие каждой работы остаётся, даже если оно старше
+        retention секунд: без него неизвестен текущий статус.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - retention if retention else 0
+        temporary = f'{self.path}.compact'
+        with self._lock:
+            self._file.flush()
+            total = self._count
+            # Из повторов одного статуса остаётся первый: момент смены.
+            previous = {}
+            changes = []
+            for record in self._scan():
+                tenant, homework, _, code = record
+                if previous.get((tenant, homework)) != code:
+                    previous[tenant, homework] = code
+                    changes.append(record)
+            latest = {}
+            for number, (tenant, homework, _, _) in enumerate(changes):
+                latest[tenant, homework] = number
+            kept = 0
+            with open(temporary, 'wb') as file:
+                for number, record in enumerate(changes):
+                    tenant, homework, timestamp, _ = record
+                    if (
+                        timestamp < cutoff
+                        and latest[tenant, homework] != number
+                    ):
+                        continue
+                    file.write(RECORD.pack(*record))
+                    kept += 1
+                file.flush()
+                os.fsync(file.fileno())
+            self._file.close()
+            os.replace(temporary, self.path)
+            self._open()
+        logging.info('Журнал статусов сжат: %d -> %d', total, kept)
+        return kept
+
+    def close(self):
+        """Сбрасывает буфер и закрывает файл."""
+        with self._lock:
+            self._file.close()
+
+
+def install_log(log):
+    """Делает журнал общим для всех пользователей процесса."""
+    global _log
+    _log = log
+
+
+def get_log():
+    """Возвращает установленный журнал или None."""
+    return _log
+
+
+def record(tenant_key, homework_key, status, timestamp):
+    """Пишет событие в установленный журнал, если он есть."""
+    events = _deferred.get()
+    if events is not None:
+        events.append((tenant_key, homework_key, status, timestamp))
+        return
+    log = _log
+    if log is not None:
+        log.append(tenant_key, homework_key, status, timestamp)
+
+
+@contextmanager
+def deferred():
+    """Откладывает события record внутри блока до его конца.
+
+    События пишутся в журнал, только если блок завершился без ошибки:
+    прерванный разбор ответа не оставляет в журнале событий, которые
+    повторятся при следующей попытке.
+    """
+    events = []
+    token = _deferred.set(events)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    for event in events:
+        record(*event)
+
+
+def maybe_flush():
+    """Сбрасывает буфер установленного журнала по интервалу."""
+    if _log is not None:
+        _log.maybe_flush()
+
+
+def flush():
+    """Сбрасывает буфер установленного журнала."""
+    if _log is not None:
+        _log.flush()
+
+
+def open_log(path=HISTORY_PATH, retention_days=HISTORY_RETENTION_DAYS):
+    """Открывает и устанавливает журнал; без пути — ничего не делает."""
+    if not path:
+        return None
+    log = HistoryLog(path)
+    if retention_days:
+        log.compact(retention_days * 86400)
+    install_log(log)
+    return log
@@ -1,27 +1,42 @@
 import logging
-import os
 import sys
 import time
+from contextvars import ContextVar
 from datetime import datetime
+from functools import partial
 from http import HTTPStatus
 
-import requests
-import telegram
-from dotenv import load_dotenv
-
+import deadline
+import history_log
+import log_pipeline
+import metrics
+from checkpoint import Checkpoint, make_key, open_store
+from config import getenv
 from exception import (
     DateInResponseNotExist,
+    RequestTimeout,
     RequestUnclear,
     ResponseCodeNotCorrect,
+    ShutdownRequested,
     UnexpectedServerError,
     UnknownTaskStatus,
 )
-
-load_dotenv()
-
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+from lazy import lazy_import
+from log_pipeline import Truncated
+from messages import MessageCatalog
+from outbox import open_outbox
+from shutdown import SHUTDOWN
+from status_diff import StatusSnapshot, homework_key, intern_status
+
+# Тяжёлые зависимости загружаются при первом использовании, а не при
+# импорте модуля: это ускоряет холодный старт рабочих процессов.
+requests = lazy_import('requests')
+telegram = lazy_import('telegram')
+http_session = lazy_import('http_session')
+
+PRACTICUM_TOKEN = getenv('PRACTICUM_TOKEN')
+TELEGRAM_TOKEN = getenv('TELEGRAM_TOKEN')
+TELEGRAM_CHAT_ID = getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
@@ -33,6 +48,11 @@ HOMEWORK_VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.',
 }
+MESSAGES = MessageCatalog(HOMEWORK_VERDICTS)
+
+# Пользователь, для которого выполняется текущий цикл опроса.
+# None означает режим одного пользователя из переменных окружения.
+current_tenant = ContextVar('current_tenant', default=None)
 
 
 def check_tokens():
@@ -41,32 +61,68 @@ def check_tokens():
     return all([PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_TOKEN])
 
 
+def get_chat_id():
+    """Возвращает chat_id текущего пользователя."""
+    tenant = current_tenant.get()
+    return TELEGRAM_CHAT_ID if tenant is None else tenant.chat_id
+
+
+def get_tenant_key():
+    """Возвращает ключ текущего пользователя для журнала статусов."""
+    tenant = current_tenant.get()
+    if tenant is None:
+        return make_key(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    return tenant.key
+
+
+def get_locale():
+    """Возвращает язык сообщений текущего пользователя."""
+    tenant = current_tenant.get()
+    return None if tenant is None else tenant.locale
+
+
+def get_headers():
+    """Возвращает заголовки запроса для текущего пользователя."""
+    tenant = current_tenant.get()
+    return HEADERS if tenant is None else tenant.headers
+
+
 def send_message(bot, message):
     """Отправляет сообщение в Telegram чат."""
     logging.debug('Отправляем сообщение в Telegram')
+    chat_id = get_chat_id()
 
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        with metrics.TELEGRAM_SEND_LATENCY.time():
+            bot.send_message(chat_id, message)
     except telegram.TelegramError as error:
-        logging.error(f'Ошибка отправки сообщения: {error}', exc_info=True)
+        logging.error('Ошибка отправки сообщения: %s', error, exc_info=True)
     else:
         logging.debug(
-            f'Отправлено на chat_id:{TELEGRAM_CHAT_ID}, сообщениe: {message}'
+            'Отправлено на chat_id:%s, сообщениe: %s',
+            chat_id, Truncated(message),
         )
 
 
-def get_api_answer(timestamp):
-    """Делает запрос к единственному эндпоинту API-сервиса."""
+def request_api(timestamp, ok_statuses=(HTTPStatus.OK,), **options):
+    """Запрашивает статусы работ и возвращает проверенный ответ HTTP."""
     logging.debug('Отправляем запрос к эндпоинту API-сервиса')
     params_request = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'timeout': deadline.request_timeout(),
+        **options,
+        'headers': {**get_headers(), **options.get('headers', {})},
         'params': {'from_date': timestamp},
     }
     logging.info('Начат запрос к API-сервиса')
 
     try:
-        response = requests.get(**params_request)
+        # Задержку каждой попытки записывает исполнитель запросов.
+        response = deadline.call(
+            partial(http_session.http_get, **params_request)
+        )
+    except RequestTimeout:
+        raise
     except requests.RequestException as error:
         raise RequestUnclear(
             f'Нет соединения c сервером: {error}\n'
@@ -80,15 +136,20 @@ def get_api_answer(timestamp):
             f'Параметры запроса: {params_request}'
         )
 
-    if response.status_code != HTTPStatus.OK:
+    if response.status_code not in ok_statuses:
         raise ResponseCodeNotCorrect(
             'API возвращает код, отличный от 200:\n'
             f'Код ошибки: {response.status_code}\n'
-            f'Параметры запроса: {params_request}'
+            f'Параметры запроса: {params_request}',
+            status_code=response.status_code,
         )
     logging.info('Запрос к API выполнен успешно')
+    return response
 
-    return response.json()
+
+def get_api_answer(timestamp):
+    """Делает запрос к единственному эндпоинту API-сервиса."""
+    return request_api(timestamp).json()
 
 
 def check_response(response):
@@ -122,8 +183,9 @@ def parse_status(homework):
             f'Неизвестный статус задания: {homework_status}'
         )
 
-    verdict = HOMEWORK_VERDICTS.get(homework_status)
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return MESSAGES.status_message(
+        homework_name, homework_status, get_locale()
+    )
 
 
 def convert_time(timestamp):
@@ -131,6 +193,59 @@ def convert_time(timestamp):
     return str(datetime.fromtimestamp(timestamp))
 
 
+def notify_changes(bot, snapshot, homeworks, last_timestamp, timestamp,
+                   muted=False, history=None):
+    """Сообщает об изменившихся работах, возвращает последнее сообщение.
+
+    С muted снимок обновляется, но сообщения не отправляются. В history,
+    если он передан, добавляются тройки (время, работа, статус). Каждая
+    смена статуса пишется в журнал history_log, если он открыт.
+    """
+    message = None
+    for homework in snapshot.diff(homeworks):
+        message = parse_status(homework)
+        if not muted:
+            send_message(bot, message)
+        if history is not None:
+            history.append((
+                timestamp, homework.get('homework_name'),
+                intern_status(homework.get('status')),
+            ))
+        history_log.record(
+            get_tenant_key(), homework_key(homework), homework.get('status'),
+            timestamp,
+        )
+        snapshot.update(homework)
+    if not homeworks and not snapshot.idle_notified:
+        message = MESSAGES.empty_message(
+            convert_time(last_timestamp), convert_time(timestamp),
+            get_locale(),
+        )
+        logging.info(message)
+        if not muted:
+            send_message(bot, message)
+        snapshot.idle_notified = True
+    if message is None:
+        logging.debug('Нет новых статусов')
+    return message
+
+
+def last_status(homeworks):
+    """Возвращает статус последней работы из ответа или None."""
+    return homeworks[0].get('status') if homeworks else None
+
+
+def restore_state(store, key):
+    """Возвращает сохранённое состояние или начальное для нового запуска."""
+    saved = store.load_all().get(key)
+    if saved is None:
+        return Checkpoint(int(time.time()), None, '', None)
+    logging.info(
+        'Состояние восстановлено с %s', convert_time(saved.timestamp)
+    )
+    return saved
+
+
 def main():
     """Основная логика работы бота."""
     logging.info('Проверка переменных')
@@ -141,39 +256,54 @@ def main():
         sys.exit(exit_message)
 
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    cache_message = ''
+    store = open_store()
+    key = make_key(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    timestamp, status, cache_message, saved = restore_state(store, key)
+    snapshot = StatusSnapshot.load(saved)
+    outbox = open_outbox(store, bot)
+    outbox.recover()
     cache_error_message = ''
 
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            last_timestamp = timestamp
-            logging.info(response)
-            timestamp = response.get('current_date')
-            homework = check_response(response)
-            if homework:
-                message = parse_status(homework[0])
-            else:
-                message = (
-                    'Список домашних работ пустой \n'
-                    f'c {convert_time(last_timestamp)} '
-                    f'до {convert_time(timestamp)}'
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                with deadline.budget():
+                    response = get_api_answer(timestamp)
+                last_timestamp = timestamp
+                logging.info('Ответ API: %s', Truncated(response))
+                timestamp = response.get('current_date')
+                homework = check_response(response)
+                # Сообщения уходят только после записи вместе с состоянием.
+                batch = outbox.batch(key, last_timestamp)
+                message = notify_changes(
+                    batch, snapshot, homework, last_timestamp, timestamp
                 )
-                logging.info(message)
-            if message.split('\n')[0] != cache_message.split('\n')[0]:
-                send_message(bot, message)
-                cache_message = message
-            else:
-                logging.debug('Нет новых статусов')
-        except Exception as error:
-            message_error = f'Сбой в работе программы: {error}'
-            logging.error(error, exc_info=True)
-            if message_error != cache_error_message:
-                send_message(bot, message_error)
-                cache_error_message = message_error
-        finally:
-            time.sleep(RETRY_PERIOD)
+                cache_message = message or cache_message
+                status = last_status(homework) or status
+                store.save(key, Checkpoint(
+                    timestamp, status, cache_message, snapshot.dump()
+                ), batch.messages)
+                store.flush()
+                history_log.flush()
+            except Exception as error:
+                message_error = f'Сбой в работе программы: {error}'
+                logging.error(error, exc_info=True)
+                metrics.ERRORS.inc(exception=type(error).__name__)
+                if message_error != cache_error_message:
+                    send_message(bot, message_error)
+                    cache_error_message = message_error
+            finally:
+                metrics.CYCLE_DURATION.observe(time.monotonic() - started)
+            # Сигнал остановки прерывает только ожидание, не начатый цикл.
+            with SHUTDOWN.idle():
+                time.sleep(RETRY_PERIOD)
+    except ShutdownRequested:
+        SHUTDOWN.log_signal()
+        logging.info('Бот остановлен')
+    finally:
+        store.close()
+        history_log.flush()
 
 
 if __name__ == '__main__':
@@ -181,4 +311,9 @@ if __name__ == '__main__':
         level=logging.DEBUG,
         format='%(asctime)s, %(levelname)s, %(message)s',
     )
+    http_session.install_session(http_session.ManagedSession(pool_size=1))
+    history_log.open_log()
+    metrics.start_server()
+    log_pipeline.start_queue_logging()
+    SHUTDOWN.install()
     main()
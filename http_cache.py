@@ -0,0 +1,95 @@
+import hashlib
+import re
+import threading
+from collections import namedtuple
+from http import HTTPStatus
+
+from homework import get_headers, request_api
+
+# current_date меняется в каждом ответе, поэтому в отпечаток не входит.
+CURRENT_DATE_PATTERN = re.compile(rb'(?<!\\)"current_date"\s*:\s*(\d+)')
+
+CacheEntry = namedtuple(
+    'CacheEntry', ('etag', 'last_modified', 'fingerprint', 'size')
+)
+# Ответ, который совпал с предыдущим и не требует разбора.
+Unchanged = namedtuple('Unchanged', ('current_date',))
+
+
+def fingerprint(body):
+    """Возвращает отпечаток ответа без поля current_date и саму дату."""
+    match = CURRENT_DATE_PATTERN.search(body)
+    current_date = int(match.group(1)) if match else None
+    if match:
+        body = body[:match.start()] + body[match.end():]
+    return hashlib.blake2b(body, digest_size=16).digest(), current_date
+
+
+class ResponseCache:
+    """Кэш ответов API для каждого пользователя.
+
+    Если сервер отдаёт ETag или Last-Modified, запрос уходит с
+    If-None-Match/If-Modified-Since и ответ 304 не скачивается. Если нет,
+    тело сравнивается по отпечатку с прошлым ответом. В обоих случаях
+    get_api_answer() возвращает Unchanged, и разбор ответа пропускается.
+    """
+
+    FIELDS = ('not_modified', 'unchanged', 'misses', 'bytes_saved')
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.FIELDS, 0)
+
+    def _count(self, field, value=1):
+        """Увеличивает счётчик."""
+        with self._lock:
+            self._counters[field] += value
+
+    def stats(self):
+        """Возвращает копию счётчиков."""
+        with self._lock:
+            return dict(self._counters)
+
+    def __str__(self):
+        counters = self.stats()
+        return ', '.join(f'{key}={value}' for key, value in counters.items())
+
+    def get_api_answer(self, timestamp):
+        """Запрашивает статусы работ с учётом сохранённого ответа."""
+        key = get_headers()['Authorization']
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        response = request_api(
+            timestamp,
+            ok_statuses=(HTTPStatus.OK, HTTPStatus.NOT_MODIFIED),
+            headers=headers,
+        )
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            self._count('not_modified')
+            self._count('bytes_saved', entry.size if entry else 0)
+            return Unchanged(None)
+
+        body = response.content
+        digest, current_date = fingerprint(body)
+        if entry is not None and entry.fingerprint == digest:
+            self._count('unchanged')
+            self._count('bytes_saved', len(body))
+            return Unchanged(current_date)
+
+        self._count('misses')
+        self._entries[key] = CacheEntry(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest,
+            len(body),
+        )
+        return response.json()
+
+    def forget(self, key):
+        """Удаляет сохранённый ответ пользователя."""
+        self._entries.pop(key, None)
@@ -0,0 +1,135 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from config import getenv
+
+HTTP_POOL_SIZE = int(getenv('HTTP_POOL_SIZE', 10))
+HTTP_POOL_BLOCK = getenv('HTTP_POOL_BLOCK', '1') == '1'
+HTTP_RETRIES = int(getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUSES = (502, 503, 504)
+
+_session = None
+
+
+class ConnectionStats:
+    """Счётчики использования соединений из пула."""
+
+    FIELDS = ('requests', 'handshakes', 'reused', 'pool_waits')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.FIELDS, 0)
+
+    def increment(self, field):
+        """Увеличивает счётчик на единицу."""
+        with self._lock:
+            self._counters[field] += 1
+
+    def snapshot(self):
+        """Возвращает копию счётчиков."""
+        with self._lock:
+            return dict(self._counters)
+
+    def __str__(self):
+        counters = self.snapshot()
+        return ', '.join(f'{key}={value}' for key, value in counters.items())
+
+
+class CountingPoolMixin:
+    """Считает новые рукопожатия, повторные соединения и ожидания пула."""
+
+    stats = None
+
+    def _get_conn(self, timeout=None):
+        if self.block and self.pool is not None and self.pool.empty():
+            self.stats.increment('pool_waits')
+        conn = super()._get_conn(timeout=timeout)
+        self.stats.increment('requests')
+        if getattr(conn, 'sock', None) is None:
+            self.stats.increment('handshakes')
+        else:
+            self.stats.increment('reused')
+        return conn
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, пулы которого ведут ConnectionStats."""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Подменяет классы пулов на считающие соединения."""
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {'stats': self.stats}
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type(
+                'CountingHTTPConnectionPool',
+                (CountingPoolMixin, HTTPConnectionPool),
+                attrs,
+            ),
+            'https': type(
+                'CountingHTTPSConnectionPool',
+                (CountingPoolMixin, HTTPSConnectionPool),
+                attrs,
+            ),
+        }
+
+
+class ManagedSession:
+    """Сессия requests с keep-alive пулом соединений и повторами."""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, pool_block=HTTP_POOL_BLOCK,
+                 retries=HTTP_RETRIES):
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        adapter = CountingHTTPAdapter(
+            self.stats,
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=pool_block,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=HTTP_BACKOFF_FACTOR,
+                status_forcelist=HTTP_RETRY_STATUSES,
+                allowed_methods=frozenset(['GET']),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """Выполняет GET запрос через пул соединений."""
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        self.session.close()
+
+
+def install_session(session):
+    """Делает сессию общей для всех запросов к API."""
+    global _session
+    _session = session
+    logging.debug('Установлена HTTP сессия: %s', session)
+
+
+def get_session():
+    """Возвращает установленную сессию или None."""
+    return _session
+
+
+def http_get(url, **kwargs):
+    """Выполняет GET через общую сессию, а без неё — через requests.get."""
+    session = _session
+    if session is None:
+        return requests.get(url, **kwargs)
+    return session.get(url, **kwargs)
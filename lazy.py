@@ -0,0 +1,23 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Возвращает модуль, который выполнится при первом обращении к нему.
+
+    Уже загруженный модуль возвращается как есть. Первое обращение к
+    атрибуту должно произойти в одном потоке: LazyLoader до Python 3.12
+    не защищён от одновременной загрузки.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
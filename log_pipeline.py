@@ -0,0 +1,101 @@
+import atexit
+import logging
+import queue
+import reprlib
+from logging.handlers import QueueHandler, QueueListener
+
+from config import getenv
+
+# Сколько символов большого объекта попадает в лог.
+LOG_PAYLOAD_LIMIT = int(getenv('LOG_PAYLOAD_LIMIT', 500))
+LOG_QUEUE_SIZE = 10000
+
+# Ограниченное представление: большие списки и словари не
+# превращаются в строку целиком ради того, чтобы её обрезать.
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 4
+_payload_repr.maxdict = 10
+_payload_repr.maxlist = 10
+_payload_repr.maxstring = LOG_PAYLOAD_LIMIT
+_payload_repr.maxother = LOG_PAYLOAD_LIMIT
+
+
+class Truncated:
+    """Обёртка, которая обрезает представление объекта в логе.
+
+    Строка строится, только если запись действительно выводится, поэтому
+    обёртку можно передавать аргументом и при выключенном уровне.
+    """
+
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit=LOG_PAYLOAD_LIMIT):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        if isinstance(self.value, str):
+            text = self.value
+        else:
+            text = _payload_repr.repr(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f'{text[:self.limit]}... (+{len(text) - self.limit} симв.)'
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует запись в вызывающем потоке.
+
+    Стандартный prepare() собирает сообщение до постановки в очередь;
+    здесь запись уходит как есть, а форматирует её поток QueueListener.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        """Возвращает запись без форматирования."""
+        return record
+
+    def enqueue(self, record):
+        """Кладёт запись в очередь, при переполнении — отбрасывает."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener, который можно останавливать повторно."""
+
+    def enqueue_sentinel(self):
+        """Ждёт места в очереди, чтобы не потерять сигнал остановки."""
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        """Выводит оставшиеся записи и останавливает поток."""
+        if self._thread is not None:
+            super().stop()
+
+
+def start_queue_logging(logger=None, queue_size=LOG_QUEUE_SIZE):
+    """Переносит вывод обработчиков логгера в фоновый поток.
+
+    Текущие обработчики (например, из logging.basicConfig) отдаются
+    QueueListener, а в логгере остаётся только обработчик очереди.
+    Возвращает запущенный QueueListener.
+    """
+    logger = logger or logging.getLogger()
+    handlers = [
+        handler for handler in logger.handlers
+        if not isinstance(handler, QueueHandler)
+    ]
+    records = queue.Queue(queue_size)
+    listener = DrainingQueueListener(
+        records, *handlers, respect_handler_level=True
+    )
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(records))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
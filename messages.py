@@ -0,0 +1,114 @@
+from functools import lru_cache
+from string import Formatter
+
+from config import getenv
+
+NATIVE_LOCALE = 'ru'
+DEFAULT_LOCALE = getenv('LOCALE', NATIVE_LOCALE)
+# Сколько готовых сообщений о смене статуса держать в памяти.
+RENDER_CACHE_SIZE = 4096
+
+TEMPLATES = {
+    'ru': {
+        'status': 'Изменился статус проверки работы "{name}". {verdict}',
+        'empty': 'Список домашних работ пустой \nc {start} до {end}',
+    },
+    'en': {
+        'status': 'Homework "{name}" status changed. {verdict}',
+        'empty': 'No homework updates \nfrom {start} to {end}',
+    },
+}
+VERDICTS = {
+    'en': {
+        'approved': 'The homework is approved. Hooray!',
+        'reviewing': 'The homework is being reviewed.',
+        'rejected': 'The reviewer left some remarks.',
+    },
+}
+
+
+class Template:
+    """Шаблон str.format, разобранный один раз при загрузке.
+
+    Поля из constants подставляются сразу, а текст между оставшимися
+    полями склеивается заранее, поэтому render() — это несколько
+    конкатенаций без разбора формата.
+    """
+
+    __slots__ = ('_head', '_tail')
+
+    def __init__(self, text, **constants):
+        literals = ['']
+        fields = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if spec or conversion:
+                raise ValueError(f'Формат поля не поддерживается: {text}')
+            literals[-1] += literal
+            if field is None:
+                continue
+            if field in constants:
+                literals[-1] += str(constants[field])
+            else:
+                fields.append(field)
+                literals.append('')
+        self._head = literals[0]
+        self._tail = tuple(zip(fields, literals[1:]))
+
+    @property
+    def fields(self):
+        """Имена полей, которые нужно передать в render()."""
+        return tuple(field for field, _ in self._tail)
+
+    def render(self, **values):
+        """Возвращает текст с подставленными значениями."""
+        text = self._head
+        for field, literal in self._tail:
+            text += f'{values[field]}{literal}'
+        return text
+
+
+class MessageCatalog:
+    """Шаблоны сообщений по языкам, собранные при запуске.
+
+    Для каждого языка и статуса шаблон сообщения о смене статуса
+    компилируется с уже подставленным вердиктом. Готовые сообщения
+    кэшируются: одно и то же (работа, статус) отправляется каждому
+    подписчику токена.
+    """
+
+    def __init__(self, verdicts, locale=DEFAULT_LOCALE, templates=TEMPLATES,
+                 catalog_verdicts=VERDICTS):
+        # verdicts — вердикты основного языка, остальные из каталога.
+        self.verdicts = {**catalog_verdicts, NATIVE_LOCALE: dict(verdicts)}
+        self.default = locale if locale in templates else NATIVE_LOCALE
+        self._status = {
+            language: {
+                status: Template(texts['status'], verdict=verdict)
+                for status, verdict in self.verdicts[language].items()
+            }
+            for language, texts in templates.items()
+        }
+        self._empty = {
+            language: Template(texts['empty'])
+            for language, texts in templates.items()
+        }
+        self.status_message = lru_cache(RENDER_CACHE_SIZE)(
+            self._status_message
+        )
+
+    def _locale(self, locale):
+        """Возвращает язык из каталога, иначе язык по умолчанию."""
+        return locale if locale in self._status else self.default
+
+    def _status_message(self, name, status, locale=None):
+        """Возвращает сообщение о смене статуса работы."""
+        templates = self._status[self._locale(locale)]
+        return templates[status].render(name=name)
+
+    def empty_message(self, start, end, locale=None):
+        """Возвращает сообщение о пустом списке работ."""
+        return self._empty[self._locale(locale)].render(start=start, end=end)
+
+    def verdict(self, status, locale=None):
+        """Возвращает вердикт по статусу или сам статус."""
+        return self.verdicts[self._locale(locale)].get(status, status)
@@ -0,0 +1,284 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import getenv
+
+METRICS_PORT = int(getenv('METRICS_PORT', 0))
+METRICS_HOST = getenv('METRICS_HOST', '127.0.0.1')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+
+
+class Registry:
+    """Набор метрик, которые отдаются на /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавляет метрику в набор."""
+        with self._lock:
+            self._metrics.append(metric)
+
+    def collect(self):
+        """Возвращает снимок метрик: (имя, тип, описание, значения)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        return [
+            (metric.name, metric.kind, metric.documentation,
+             list(metric.samples()))
+            for metric in metrics
+        ]
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        return render_families(self.collect())
+
+
+def render_families(families):
+    """Форматирует снимки метрик в текстовом формате Prometheus."""
+    lines = []
+    for name, kind, documentation, samples in families:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def format_labels(labels):
+    """Форматирует метки в виде {name="value",...}."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """Общая часть метрик: имя, описание и регистрация."""
+
+    kind = None
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def samples(self):
+        """Возвращает тройки (суффикс имени, метки, значение)."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик с необязательными метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        super().__init__(name, documentation, registry)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        """Увеличивает счётчик для набора меток."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Возвращает значение счётчика для набора меток."""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        """Возвращает значения по всем наборам меток."""
+        with self._lock:
+            items = list(self._values.items())
+        return [('_total', key, value) for key, value in items]
+
+
+class Gauge(Metric):
+    """Текущее значение, заданное явно или функцией."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, registry=REGISTRY):
+        super().__init__(name, documentation, registry)
+        self._value = 0
+        self._function = None
+
+    def set(self, value):
+        """Задаёт значение."""
+        self._value = value
+
+    def set_function(self, function):
+        """Задаёт функцию, которая вычисляет значение при чтении."""
+        self._function = function
+
+    def value(self):
+        """Возвращает текущее значение."""
+        return self._value if self._function is None else self._function()
+
+    def samples(self):
+        """Возвращает текущее значение."""
+        return [('', (), self.value())]
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам.
+
+    observe() стоит одного bisect и одного захвата блокировки, поэтому
+    метрику можно держать включённой на горячем пути.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS,
+                 registry=REGISTRY):
+        super().__init__(name, documentation, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        """Добавляет наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Замеряет длительность блока кода в секундах."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def count(self):
+        """Возвращает число наблюдений."""
+        return sum(self._counts)
+
+    def quantile(self, q):
+        """Оценивает квантиль q по корзинам, как histogram_quantile.
+
+        Внутри корзины значения считаются распределёнными равномерно.
+        Возвращает None, пока наблюдений нет.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        rank = q * sum(counts)
+        if not rank:
+            return None
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+    def samples(self):
+        """Возвращает накопленные корзины, сумму и число наблюдений."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            samples.append(('_bucket', (('le', bound),), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), cumulative))
+        return samples
+
+
+API_LATENCY = Histogram(
+    'homework_api_request_seconds', 'Длительность запроса к API Практикума.'
+)
+TELEGRAM_SEND_LATENCY = Histogram(
+    'telegram_send_seconds',
+    'Длительность вызова bot.send_message в send_message '
+    '(при очереди отправки — время постановки в очередь).',
+)
+DELIVERY_LATENCY = Histogram(
+    'telegram_delivery_seconds',
+    'Длительность отправки из очереди в Telegram с повторами.',
+)
+CYCLE_DURATION = Histogram(
+    'poll_cycle_seconds', 'Длительность одного цикла опроса пользователя.'
+)
+ERRORS = Counter(
+    'poll_errors', 'Ошибки цикла опроса по классу исключения.'
+)
+SCHEDULED_POLLS = Gauge('poll_scheduled', 'Запланированные опросы.')
+IN_FLIGHT_POLLS = Gauge('poll_in_flight', 'Опросы, выполняемые сейчас.')
+DELIVERY_QUEUE_DEPTH = Gauge(
+    'telegram_queue_depth', 'Сообщения, ожидающие отправки.'
+)
+COALESCED_POLLS = Counter(
+    'poll_coalesced', 'Опросы, получившие ответ чужого одинакового запроса.'
+)
+HEDGED_REQUESTS = Counter(
+    'api_hedged_requests', 'Повторные запросы к API, отправленные, '
+    'когда первый не ответил за p95.'
+)
+API_TIMEOUTS = Counter(
+    'api_budget_exceeded', 'Запросы к API, не уложившиеся в бюджет цикла.'
+)
+API_CIRCUIT_OPEN = Gauge(
+    'api_circuit_open', 'Предохранитель запросов к API разомкнут.'
+)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт метрики по адресу /metrics."""
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        """Отвечает текстом метрик или 404."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Пишет запросы в лог на уровне DEBUG."""
+        logging.debug('metrics: ' + format, *args)
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY):
+    """Запускает HTTP сервер метрик в фоновом потоке, 0 — не запускать."""
+    if not port:
+        return None
+    handler = type('Handler', (MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    )
+    thread.start()
+    logging.info('Метрики доступны на http://%s:%s/metrics', host, port)
+    return server
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import threading
+from functools import partial
+
+import metrics
+from checkpoint import OutboxMessage
+from delivery import is_permanent, telegram
+
+
+def message_id(*parts):
+    """Возвращает ключ идемпотентности сообщения по его происхождению."""
+    text = '\x1f'.join(str(part) for part in parts)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class OutboxBatch:
+    """Собирает сообщения одного цикла опроса вместо отправки.
+
+    Передаётся вместо бота: send_message лишь запоминает сообщение.
+    Ключ сообщения строится из ключа пользователя key, scope цикла,
+    порядкового номера и текста, поэтому повтор того же цикла даёт те же
+    ключи.
+    """
+
+    def __init__(self, key, *scope):
+        self.key = key
+        self.scope = scope
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        """Добавляет сообщение в пачку."""
+        self.messages.append(OutboxMessage(
+            message_id(
+                self.key, *self.scope, len(self.messages), chat_id, text
+            ),
+            self.key, chat_id, text,
+        ))
+
+
+class DirectBatch:
+    """Пачка, которая отправляет сообщения сразу, без исходящей очереди."""
+
+    messages = ()
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def send_message(self, chat_id, text):
+        """Отправляет сообщение через бота."""
+        return self.bot.send_message(chat_id, text)
+
+
+class DirectOutbox:
+    """Отправка без исходящей очереди для хранилищ без её поддержки."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def batch(self, key, *scope):
+        """Возвращает пачку, отправляющую сообщения сразу."""
+        return DirectBatch(self.bot)
+
+    def recover(self, accept=None):
+        """Неотправленных сообщений не бывает."""
+
+
+class Dispatcher:
+    """Отправляет сообщения исходящей очереди хранилища.
+
+    Сообщения попадают к диспетчеру только после того, как записаны
+    вместе с состоянием, а удаляются из очереди отметкой mark_delivered
+    со следующей пачкой записи. С queued бот — DeliveryQueue, и отметка
+    ставится из её обратного вызова. Ключи сообщений в отправке
+    запоминаются, поэтому recover() не дублирует сообщения, которые ещё
+    в очереди. Telegram не принимает ключей идемпотентности, так что
+    сообщение, отправленное перед самым падением, может прийти повторно,
+    но не потеряется.
+    """
+
+    def __init__(self, store, bot, queued=False):
+        self.store = store
+        self.bot = bot
+        self.queued = queued
+        self._sending = set()
+        self._lock = threading.Lock()
+        store.on_commit = self.dispatch
+
+    def batch(self, key, *scope):
+        """Возвращает пачку для сообщений цикла пользователя key."""
+        return OutboxBatch(key, *scope)
+
+    def recover(self, accept=None):
+        """Отправляет записанные, но не доставленные раньше сообщения.
+
+        accept отбирает ключи пользователей, сообщения которых досылает
+        этот процесс.
+        """
+        messages = self.store.pending_messages(accept)
+        if messages:
+            logging.info('Неотправленных сообщений: %d', len(messages))
+            self.dispatch(messages)
+
+    def _claim(self, message):
+        """Запоминает сообщение в отправке; False — оно уже отправляется."""
+        with self._lock:
+            if message.id in self._sending:
+                return False
+            self._sending.add(message.id)
+            return True
+
+    def _finished(self, key, delivered):
+        """Отмечает доставленное сообщение и снимает его с отправки."""
+        # Отметка ставится первой: иначе recover() между двумя шагами
+        # увидел бы сообщение ни отправляемым, ни доставленным.
+        if delivered:
+            self.store.mark_delivered(key)
+        with self._lock:
+            self._sending.discard(key)
+
+    def _send(self, message):
+        """Отправляет сообщение сразу; True — повторять не нужно."""
+        try:
+            with metrics.TELEGRAM_SEND_LATENCY.time():
+                self.bot.send_message(message.chat_id, message.text)
+        except telegram.TelegramError as error:
+            logging.error(
+                'Ошибка отправки сообщения в %s: %s', message.chat_id, error
+            )
+            # Отклонённое Telegram сообщение повторять бессмысленно.
+            return is_permanent(error)
+        return True
+
+    def dispatch(self, messages):
+        """Отправляет записанные сообщения."""
+        direct = False
+        for message in messages:
+            if not self._claim(message):
+                continue
+            if not self.queued:
+                self._finished(message.id, self._send(message))
+                direct = True
+                continue
+            try:
+                self.bot.send_message(
+                    message.chat_id, message.text,
+                    done=partial(self._finished, message.id),
+                )
+            except RuntimeError:
+                # Очередь закрыта: сообщение уйдёт после перезапуска.
+                self._finished(message.id, False)
+        if direct:
+            # Без очереди отметки записываются сразу, чтобы окно
+            # повторной отправки было как можно короче.
+            self.store.flush()
+
+
+def open_outbox(store, bot, queued=False):
+    """Возвращает диспетчер исходящей очереди или прямую отправку."""
+    if store.durable_outbox:
+        return Dispatcher(store, bot, queued)
+    return DirectOutbox(bot)
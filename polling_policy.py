@@ -0,0 +1,70 @@
+from config import getenv
+from homework import RETRY_PERIOD
+
+REVIEWING_INTERVAL = int(getenv('POLL_INTERVAL_REVIEWING', 120))
+MAX_INTERVAL = int(getenv('POLL_INTERVAL_MAX', 3600))
+BACKOFF_FACTOR = float(getenv('POLL_BACKOFF_FACTOR', 1.5))
+# Общий бюджет запросов к API в секунду на процесс, 0 — без ограничения.
+API_BUDGET_RPS = float(getenv('API_BUDGET_RPS', 0))
+
+# Базовый интервал опроса для статуса последней работы.
+STATUS_INTERVALS = {
+    'reviewing': REVIEWING_INTERVAL,
+    'rejected': RETRY_PERIOD,
+    'approved': RETRY_PERIOD,
+    None: RETRY_PERIOD,
+}
+# Статусы, при которых проверка не идёт и опрос можно замедлять.
+IDLE_STATUSES = frozenset(['approved', None])
+
+
+class AdaptivePolicy:
+    """Выбирает интервал опроса по статусу последней домашней работы.
+
+    Пока работа на проверке, опрос идёт чаще. Когда в полёте ничего нет,
+    интервал растёт в BACKOFF_FACTOR раз до MAX_INTERVAL. Смена статуса
+    сбрасывает интервал к базовому. Если суммарная частота запросов
+    превышает budget_rps, все интервалы растягиваются пропорционально.
+    """
+
+    def __init__(self, budget_rps=API_BUDGET_RPS,
+                 intervals=STATUS_INTERVALS, max_interval=MAX_INTERVAL,
+                 backoff_factor=BACKOFF_FACTOR):
+        self.budget_rps = budget_rps
+        self.intervals = intervals
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.total_rate = 0.0
+
+    def _base_interval(self, tenant):
+        """Возвращает интервал без учёта бюджета."""
+        base = self.intervals.get(tenant.status, RETRY_PERIOD)
+        if tenant.status != tenant.interval_status or not tenant.interval:
+            return base
+        if tenant.status in IDLE_STATUSES:
+            return min(
+                self.max_interval, tenant.interval * self.backoff_factor
+            )
+        return base
+
+    def next_interval(self, tenant):
+        """Вычисляет и запоминает интервал до следующего опроса."""
+        interval = self._base_interval(tenant)
+        if tenant.interval:
+            self.total_rate -= 1 / tenant.interval
+        self.total_rate += 1 / interval
+        tenant.interval = interval
+        tenant.interval_status = tenant.status
+        return interval * self.budget_scale()
+
+    def forget(self, tenant):
+        """Исключает пользователя из расчёта бюджета."""
+        if tenant.interval:
+            self.total_rate -= 1 / tenant.interval
+            tenant.interval = 0
+
+    def budget_scale(self):
+        """Во сколько раз растянуть интервалы, чтобы уложиться в бюджет."""
+        if not self.budget_rps or self.total_rate <= self.budget_rps:
+            return 1
+        return self.total_rate / self.budget_rps
@@ -0,0 +1,102 @@
+import heapq
+import itertools
+import random
+import time
+
+DEFAULT_JITTER = 0.1
+# Доля отменённых записей в куче, после которой куча пересобирается.
+COMPACT_RATIO = 0.5
+
+
+class PollScheduler:
+    """Очередь сроков опроса пользователей на двоичной куче.
+
+    Добавление и перенос стоят O(log n), отмена — O(1): запись лишь
+    помечается удалённой и выбрасывается при извлечении из кучи.
+    Срок размывается на ±jitter от интервала, чтобы тысячи пользователей
+    не обращались к API в одну и ту же секунду.
+    """
+
+    def __init__(self, jitter=DEFAULT_JITTER, clock=time.monotonic,
+                 rng=None):
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _jittered(self, delay):
+        """Размывает интервал на ±jitter."""
+        if not self.jitter:
+            return delay
+        spread = delay * self.jitter
+        return delay + self.rng.uniform(-spread, spread)
+
+    def add(self, key, delay, spread=False):
+        """Планирует опрос key через delay секунд.
+
+        С spread=True срок выбирается равномерно в [0, delay): так
+        распределяется первый опрос при старте большого числа пользователей.
+        Повторное добавление переносит уже запланированный срок.
+        """
+        if key in self._entries:
+            self.cancel(key)
+        if spread:
+            delay = self.rng.uniform(0, delay)
+        else:
+            delay = self._jittered(delay)
+        entry = [self.clock() + max(0, delay), next(self._counter), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    reschedule = add
+
+    def cancel(self, key):
+        """Отменяет запланированный опрос, если он есть."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        self._cancelled += 1
+        if self._cancelled > len(self._heap) * COMPACT_RATIO:
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Убирает отменённые записи из кучи."""
+        self._heap = [entry for entry in self._heap if entry[-1] is not None]
+        heapq.heapify(self._heap)
+        self._cancelled = 0
+
+    def _drop_cancelled(self):
+        """Снимает отменённые записи с вершины кучи."""
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def next_deadline(self):
+        """Возвращает ближайший срок или None, если очередь пуста."""
+        self._drop_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None, limit=None):
+        """Извлекает ключи, срок которых наступил к моменту now."""
+        now = self.clock() if now is None else now
+        due = []
+        while limit is None or len(due) < limit:
+            self._drop_cancelled()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            entry = heapq.heappop(self._heap)
+            key = entry[-1]
+            del self._entries[key]
+            due.append(key)
+        return due
@@ -0,0 +1,84 @@
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from config import getenv
+from exception import ShutdownRequested
+
+# За сколько секунд процесс должен завершить работу после сигнала.
+SHUTDOWN_TIMEOUT = float(getenv('SHUTDOWN_TIMEOUT', 30))
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Shutdown:
+    """Флаг мягкой остановки процесса по сигналу.
+
+    Сигнал только поднимает флаг: начатый запрос к API или отправка
+    сообщения доводятся до конца, а цикл опроса проверяет requested и
+    больше не начинает новых. Внутри idle() процесс ничего не делает,
+    поэтому там сигнал сразу прерывает ожидание исключением
+    ShutdownRequested. На всё завершение после сигнала отводится
+    timeout секунд, остаток отдаёт remaining().
+
+    Обработчик сигнала ничего не пишет в лог: запись могла бы зайти в
+    блокировку очереди логов, уже взятую прерванным потоком. О сигнале
+    пишет log_signal(), когда цикл заметил флаг.
+    """
+
+    def __init__(self, timeout=SHUTDOWN_TIMEOUT, clock=time.monotonic):
+        self.timeout = timeout
+        self.clock = clock
+        self.deadline = None
+        self.signum = None
+        self._event = threading.Event()
+        self._idle = False
+
+    @property
+    def requested(self):
+        """Запрошена ли остановка."""
+        return self._event.is_set()
+
+    def request(self, signum=None, frame=None):
+        """Запрашивает остановку; годится как обработчик сигнала."""
+        if self.signum is None:
+            self.signum = signum
+        if self.deadline is None:
+            self.deadline = self.clock() + self.timeout
+        self._event.set()
+        if self._idle:
+            raise ShutdownRequested
+
+    def log_signal(self):
+        """Пишет в лог сигнал остановки; вызывается не из обработчика."""
+        if self.signum is not None:
+            logging.info(
+                'Получен %s, завершение работы',
+                signal.Signals(self.signum).name,
+            )
+
+    def remaining(self):
+        """Возвращает секунды, оставшиеся на завершение работы."""
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - self.clock())
+
+    @contextmanager
+    def idle(self):
+        """Отмечает ожидание, которое сигнал может прервать."""
+        if self.requested:
+            raise ShutdownRequested
+        self._idle = True
+        try:
+            yield
+        finally:
+            self._idle = False
+
+    def install(self, signals=SIGNALS):
+        """Назначает request() обработчиком сигналов остановки."""
+        for signum in signals:
+            signal.signal(signum, self.request)
+
+
+SHUTDOWN = Shutdown()
@@ -0,0 +1,78 @@
+import sys
+
+
+def intern_status(status):
+    """Возвращает общий для всех пользователей объект строки статуса."""
+    return sys.intern(status) if isinstance(status, str) else status
+
+
+def homework_key(homework):
+    """Возвращает ключ работы: id, а если его нет — название."""
+    key = homework.get('id')
+    if key is None:
+        key = homework.get('homework_name')
+    return str(key)
+
+
+class StatusSnapshot:
+    """Последние известные статусы работ пользователя по их ключу.
+
+    Вместо сравнения текстов сообщений сравниваются статусы: diff()
+    возвращает только работы, чей статус отличается от сохранённого.
+    idle_notified отмечает, что о пустом списке работ уже сообщено.
+    names хранит названия работ, ключом которых служит id; пока таких
+    нет, вместо пустого словаря хранится None. Статусы интернируются:
+    у миллиона работ всего несколько разных строк статуса.
+    """
+
+    __slots__ = ('statuses', 'idle_notified', 'names')
+
+    def __init__(self, statuses=None, idle_notified=False, names=None):
+        self.statuses = {
+            key: intern_status(status)
+            for key, status in (statuses or {}).items()
+        }
+        self.idle_notified = idle_notified
+        self.names = dict(names) if names else None
+
+    def diff(self, homeworks):
+        """Возвращает работы, статус которых изменился."""
+        statuses = self.statuses
+        return [
+            homework for homework in homeworks
+            if statuses.get(homework_key(homework)) != homework.get('status')
+        ]
+
+    def update(self, homework):
+        """Запоминает статус работы, о котором отправлено уведомление."""
+        key = homework_key(homework)
+        self.statuses[key] = intern_status(homework.get('status'))
+        name = homework.get('homework_name')
+        if name is not None and name != key:
+            if self.names is None:
+                self.names = {}
+            self.names[key] = name
+        self.idle_notified = False
+
+    def name(self, key):
+        """Возвращает название работы по её ключу."""
+        if self.names is None:
+            return key
+        return self.names.get(key, key)
+
+    def dump(self):
+        """Возвращает снимок в виде, пригодном для JSON."""
+        return {
+            'statuses': self.statuses,
+            'idle': self.idle_notified,
+            'names': self.names or {},
+        }
+
+    @classmethod
+    def load(cls, data):
+        """Восстанавливает снимок из dump(), None даёт пустой снимок."""
+        if not data:
+            return cls()
+        return cls(
+            data.get('statuses'), data.get('idle', False), data.get('names')
+        )
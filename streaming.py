@@ -0,0 +1,159 @@
+import codecs
+import json
+import logging
+
+from config import getenv
+from exception import DateInResponseNotExist
+from homework import request_api
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+JSON_BACKEND = getenv('JSON_BACKEND', 'json')
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+BACKENDS = {'json': json.JSONDecoder}
+if simplejson is not None:
+    BACKENDS['simplejson'] = simplejson.JSONDecoder
+
+
+def get_decoder(backend=JSON_BACKEND):
+    """Возвращает декодер JSON выбранной библиотеки."""
+    if backend not in BACKENDS:
+        logging.warning(
+            'JSON библиотека %s недоступна, используется json', backend
+        )
+        backend = 'json'
+    return BACKENDS[backend]()
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа API с проверкой формы за один проход.
+
+    Итерация по объекту отдаёт работы из списка homeworks по одной, не
+    загружая весь ответ в память. Проверяется то же, что и в
+    check_response: ответ — словарь, homeworks — список, current_date
+    есть. Так как current_date может идти после списка, ошибка о его
+    отсутствии возникает в конце итерации; значение доступно в атрибуте
+    current_date после неё. close() освобождает соединение ответа, если
+    разбор прерван.
+    """
+
+    def __init__(self, chunks, decoder=None, close=None):
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decode = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = decoder or get_decoder()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+        self.current_date = None
+        self.fields = {}
+
+    def close(self):
+        """Закрывает ответ, из которого читается поток."""
+        if self._close is not None:
+            self._close()
+
+    def _read(self):
+        """Дочитывает следующий кусок ответа, False — если данных нет."""
+        if self._exhausted:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._exhausted = True
+            chunk = self._decode.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            chunk = self._decode.decode(chunk)
+        if self._pos > CHUNK_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += chunk
+        return True
+
+    def _peek(self):
+        """Пропускает пробелы и возвращает следующий символ или ''."""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def _expect(self, char):
+        """Проверяет и пропускает ожидаемый символ."""
+        if self._peek() != char:
+            raise ValueError(
+                f'Ожидался символ {char!r} в позиции {self._pos} ответа API'
+            )
+        self._pos += 1
+
+    def _value(self):
+        """Декодирует следующее значение JSON целиком."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if self._read():
+                    continue
+                raise
+            # Число на границе куска могло быть обрезано.
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
+
+    def _items(self):
+        """Отдаёт элементы массива, на начале которого стоит разбор."""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ']':
+                self._pos += 1
+                return
+            self._expect(',')
+
+    def __iter__(self):
+        if self._peek() != '{':
+            raise TypeError('Нет словоря в ответе API')
+        self._pos += 1
+        seen_homeworks = False
+        first = True
+        while self._peek() != '}':
+            if not first:
+                self._expect(',')
+            first = False
+            key = self._value()
+            self._expect(':')
+            if key != 'homeworks':
+                self.fields[key] = self._value()
+                continue
+            if self._peek() != '[':
+                raise TypeError('Нет списка в ответе API')
+            seen_homeworks = True
+            yield from self._items()
+        self._pos += 1
+        if not seen_homeworks:
+            raise TypeError('Нет списка в ответе API')
+        self.current_date = self.fields.get('current_date')
+        if not self.current_date:
+            raise DateInResponseNotExist('Нет даты в ответе')
+
+
+def stream_api_answer(timestamp):
+    """Запрашивает статусы работ и разбирает ответ потоком."""
+    response = request_api(timestamp, stream=True)
+    return HomeworkStream(
+        response.iter_content(CHUNK_SIZE), close=response.close
+    )
@@ -0,0 +1,283 @@
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+import log_pipeline
+import metrics
+from checkpoint import CHECKPOINT_BACKEND, CHECKPOINT_PATH, open_store
+from config import getenv
+from engine import TENANTS_FILE, check_telegram_token, serve
+from history_log import HISTORY_PATH, open_log
+from shutdown import SHUTDOWN_TIMEOUT
+from tenant_config import ConfigWatcher
+
+WORKERS = int(getenv('WORKERS', os.cpu_count() or 1))
+# Виртуальных узлов на рабочий процесс в кольце хешей.
+RING_REPLICAS = 128
+METRICS_PUSH_INTERVAL = 5
+RESTART_MAX_DELAY = 60
+MONITOR_INTERVAL = 1
+# Сколько секунд процесс должен проработать, чтобы счётчик его падений
+# обнулился и пауза перед перезапуском снова стала короткой.
+HEALTHY_UPTIME = 60
+# Запас к SHUTDOWN_TIMEOUT воркера, после которого он убивается.
+STOP_GRACE = 5
+
+
+def ring_hash(value):
+    """Возвращает позицию строки на кольце."""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Кольцо согласованного хеширования пользователей по процессам.
+
+    При добавлении или удалении узла к другому узлу переходят только
+    ключи, попавшие на его участки кольца, — около 1/N всех ключей.
+    """
+
+    def __init__(self, nodes=(), replicas=RING_REPLICAS):
+        self.replicas = replicas
+        self._positions = []
+        self._nodes = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        """Добавляет узел и его виртуальные копии на кольцо."""
+        for replica in range(self.replicas):
+            position = ring_hash(f'{node}#{replica}')
+            index = bisect.bisect(self._positions, position)
+            self._positions.insert(index, position)
+            self._nodes.insert(index, node)
+
+    def remove_node(self, node):
+        """Убирает узел с кольца."""
+        kept = [
+            (position, owner)
+            for position, owner in zip(self._positions, self._nodes)
+            if owner != node
+        ]
+        self._positions = [position for position, _ in kept]
+        self._nodes = [owner for _, owner in kept]
+
+    def node_for(self, key):
+        """Возвращает узел, которому принадлежит ключ."""
+        if not self._positions:
+            raise LookupError('На кольце нет узлов')
+        index = bisect.bisect(self._positions, ring_hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+def worker_name(number):
+    """Возвращает имя рабочего процесса на кольце."""
+    return f'worker-{number}'
+
+
+def shard_filter(number, workers):
+    """Возвращает проверку, принадлежит ли ключ рабочему процессу."""
+    ring = HashRing(worker_name(index) for index in range(workers))
+    name = worker_name(number)
+    return lambda key: ring.node_for(key) == name
+
+
+def shard_tenants(tenants, number, workers):
+    """Выбирает пользователей, принадлежащих рабочему процессу."""
+    owns = shard_filter(number, workers)
+    return [tenant for tenant in tenants if owns(tenant.key)]
+
+
+def push_metrics(number, metrics_queue, interval=METRICS_PUSH_INTERVAL):
+    """Периодически отправляет снимок метрик процесса супервизору."""
+    while True:
+        try:
+            metrics_queue.put_nowait((number, metrics.REGISTRY.collect()))
+        except queue.Full:
+            pass
+        time.sleep(interval)
+
+
+def run_worker(number, workers, metrics_queue):
+    """Точка входа рабочего процесса: опрос своей доли пользователей."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s, {worker_name(number)}, %(levelname)s, '
+               '%(message)s',
+    )
+    log_pipeline.start_queue_logging()
+    # Добавленные в файл пользователи подхватываются своим процессом.
+    watcher = ConfigWatcher(
+        TENANTS_FILE, accept=shard_filter(number, workers)
+    )
+    threading.Thread(
+        target=push_metrics, args=(number, metrics_queue), daemon=True
+    ).start()
+    path = CHECKPOINT_PATH
+    if path and CHECKPOINT_BACKEND == 'log':
+        # Журнал не рассчитан на запись из нескольких процессов.
+        path = f'{path}.{worker_name(number)}'
+    history = None
+    if HISTORY_PATH:
+        history = open_log(f'{HISTORY_PATH}.{worker_name(number)}')
+    # Обновления Telegram может забирать только один процесс.
+    serve(watcher, open_store(path), commands=False, history=history)
+
+
+class WorkerMetrics:
+    """Последние снимки метрик рабочих процессов с меткой worker."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def update(self, number, families):
+        """Запоминает снимок метрик процесса."""
+        with self._lock:
+            self._families[number] = families
+
+    def render(self):
+        """Возвращает метрики всех процессов в формате Prometheus."""
+        with self._lock:
+            snapshots = sorted(self._families.items())
+        merged = {}
+        for number, families in snapshots:
+            label = (('worker', number),)
+            for name, kind, documentation, samples in families:
+                family = merged.setdefault(name, (kind, documentation, []))
+                family[2].extend(
+                    (suffix, label + tuple(labels), value)
+                    for suffix, labels, value in samples
+                )
+        return metrics.render_families(
+            (name, kind, documentation, samples)
+            for name, (kind, documentation, samples) in merged.items()
+        )
+
+
+class Supervisor:
+    """Запускает рабочие процессы и перезапускает упавшие.
+
+    Каждый процесс опрашивает свою долю пользователей, выбранную
+    согласованным хешированием, тем же конвейером, что и engine.py.
+    """
+
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self.context = multiprocessing.get_context('spawn')
+        self.metrics_queue = self.context.Queue(workers * 4)
+        self.metrics = WorkerMetrics()
+        self.processes = {}
+        self.failures = dict.fromkeys(range(workers), 0)
+        self.restart_at = {}
+        self.started_at = {}
+        self.running = True
+
+    def start_worker(self, number):
+        """Запускает рабочий процесс с номером number."""
+        process = self.context.Process(
+            target=run_worker,
+            args=(number, self.workers, self.metrics_queue),
+            name=worker_name(number),
+        )
+        process.start()
+        self.processes[number] = process
+        self.started_at[number] = time.monotonic()
+        logging.info('Запущен %s, pid %s', process.name, process.pid)
+
+    def check_workers(self):
+        """Планирует и выполняет перезапуск упавших процессов.
+
+        Счётчик падений обнуляется, только когда процесс проработал
+        HEALTHY_UPTIME: процесс, падающий при запуске, успевает отправить
+        метрики, но не должен сбрасывать свою паузу перезапуска.
+        """
+        now = time.monotonic()
+        for number, process in self.processes.items():
+            if process.is_alive():
+                if now - self.started_at[number] >= HEALTHY_UPTIME:
+                    self.failures[number] = 0
+                continue
+            if number in self.restart_at:
+                continue
+            self.failures[number] += 1
+            delay = min(RESTART_MAX_DELAY, 2 ** self.failures[number])
+            logging.error(
+                '%s завершился с кодом %s, перезапуск через %s с',
+                process.name, process.exitcode, delay,
+            )
+            self.restart_at[number] = now + delay
+        for number, restart_at in list(self.restart_at.items()):
+            if restart_at <= now:
+                del self.restart_at[number]
+                self.start_worker(number)
+
+    def collect_metrics(self, timeout):
+        """Принимает снимки метрик от процессов в течение timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                number, families = self.metrics_queue.get(timeout=remaining)
+            except queue.Empty:
+                return
+            self.metrics.update(number, families)
+
+    def stop(self, *args):
+        """Останавливает рабочие процессы."""
+        self.running = False
+
+    def run(self):
+        """Запускает процессы и следит за ними до остановки."""
+        signal.signal(signal.SIGTERM, self.stop)
+        for number in range(self.workers):
+            self.start_worker(number)
+        try:
+            while self.running:
+                self.collect_metrics(MONITOR_INTERVAL)
+                self.check_workers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_workers()
+
+    def stop_workers(self, timeout=SHUTDOWN_TIMEOUT + STOP_GRACE):
+        """Просит процессы завершиться и убивает не успевшие.
+
+        По SIGTERM воркер дожидается запросов в полёте, отправляет
+        очередь сообщений и сохраняет состояние, поэтому перед SIGKILL
+        ему даётся timeout секунд.
+        """
+        for process in self.processes.values():
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logging.error('%s не завершился, SIGKILL', process.name)
+                process.kill()
+                process.join()
+
+
+def main():
+    """Запускает супервизор рабочих процессов."""
+    check_telegram_token()
+    supervisor = Supervisor()
+    metrics.start_server(registry=supervisor.metrics)
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s, supervisor, %(levelname)s, %(message)s',
+    )
+    main()
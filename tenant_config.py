@@ -0,0 +1,125 @@
+import json
+import logging
+import math
+import os
+import time
+from collections import namedtuple
+
+from checkpoint import make_key
+from config import getenv
+from polling_policy import STATUS_INTERVALS
+
+# Как часто проверять, не изменился ли файл пользователей, секунды.
+CONFIG_RELOAD_INTERVAL = float(getenv('CONFIG_RELOAD_INTERVAL', 5))
+# Ключ интервала для пользователей, у которых ещё нет работ.
+DEFAULT_INTERVAL_KEY = 'default'
+
+TenantRecord = namedtuple('TenantRecord', ('token', 'chat_id', 'locale'))
+TenantConfig = namedtuple('TenantConfig', ('tenants', 'intervals'))
+
+
+def parse_intervals(data):
+    """Возвращает интервалы опроса по статусам с учётом настроек."""
+    intervals = dict(STATUS_INTERVALS)
+    if data is None:
+        return intervals
+    if not isinstance(data, dict):
+        raise TypeError('Интервалы опроса должны быть словарём')
+    for status, seconds in data.items():
+        if status == DEFAULT_INTERVAL_KEY:
+            status = None
+        seconds = float(seconds)
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError(
+                f'Интервал опроса должен быть конечным и больше 0: {status}'
+            )
+        intervals[status] = seconds
+    return intervals
+
+
+def parse_config(data):
+    """Разбирает содержимое файла пользователей.
+
+    Файл — либо список пользователей, либо словарь со списком tenants и
+    необязательными интервалами опроса intervals по статусам.
+    """
+    intervals = None
+    if isinstance(data, dict):
+        intervals = data.get('intervals')
+        data = data.get('tenants')
+    if not isinstance(data, list):
+        raise TypeError('Файл пользователей должен содержать список')
+    tenants = {}
+    for record in data:
+        tenant = TenantRecord(
+            record['practicum_token'], record['chat_id'],
+            record.get('locale'),
+        )
+        tenants[make_key(tenant.token, tenant.chat_id)] = tenant
+    return TenantConfig(tenants, parse_intervals(intervals))
+
+
+def load_config(path):
+    """Читает и разбирает файл пользователей."""
+    with open(path, encoding='utf-8') as file:
+        return parse_config(json.load(file))
+
+
+class ConfigWatcher:
+    """Следит за файлом пользователей и перечитывает его при изменении.
+
+    poll() дёшев: раз в interval секунд он сравнивает время изменения и
+    размер файла и только при их смене читает файл. Файл, который не
+    удалось прочитать или разобрать, пишется в лог и пропускается, а
+    процесс продолжает работать со старой конфигурацией. accept
+    отбирает ключи пользователей этого процесса.
+    """
+
+    def __init__(self, path, interval=CONFIG_RELOAD_INTERVAL, accept=None,
+                 clock=time.monotonic):
+        self.path = path
+        self.interval = interval
+        self.accept = accept
+        self.clock = clock
+        self._checked = clock()
+        self._stamp = None
+
+    def _stat(self):
+        """Возвращает время изменения и размер файла."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _select(self, config):
+        """Оставляет в конфигурации только пользователей процесса."""
+        if self.accept is None:
+            return config
+        return config._replace(tenants={
+            key: record for key, record in config.tenants.items()
+            if self.accept(key)
+        })
+
+    def load(self):
+        """Читает конфигурацию при запуске; ошибки не перехватываются."""
+        self._stamp = self._stat()
+        return self._select(load_config(self.path))
+
+    def poll(self):
+        """Возвращает новую конфигурацию, если файл изменился, иначе None."""
+        if self.clock() - self._checked < self.interval:
+            return None
+        self._checked = self.clock()
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            config = load_config(self.path)
+        except Exception as error:
+            # Любая ошибка разбора — повод не применять файл, а не
+            # останавливать опрос.
+            logging.error('Файл пользователей не применён: %r', error)
+            return None
+        return self._select(config)
@@ -19,5 +19,6 @@ if (
     )
 
 pytest_plugins = [
-    'tests.fixtures.fixture_data'
+    'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_server',
 ]
@@ -0,0 +1,43 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+def json_response(data, status=200, headers=None):
+    return status, headers or {}, json.dumps(data).encode()
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self)
+        status, headers, body = self.server.respond(self)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAPIHandler)
+    server.requests = []
+    server.respond = lambda request: json_response(
+        {'homeworks': [], 'current_date': 1}
+    )
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/'
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
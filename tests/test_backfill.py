@@ -0,0 +1,107 @@
+import json
+from http import HTTPStatus
+
+import requests
+
+import utils
+
+
+class TestBackfill:
+    def test_seeds_state_without_notifications(self, monkeypatch, tmp_path,
+                                               random_timestamp):
+        import engine
+        from backfill import Backfill
+        from checkpoint import LogCheckpointStore
+
+        requested = []
+        closed = []
+
+        def mock_get(*args, **kwargs):
+            token = kwargs['headers']['Authorization']
+            requested.append((token, kwargs['params']['from_date']))
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            data = {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                ],
+                'current_date': random_timestamp,
+            }
+            if token == 'OAuth broken':
+                data = {'homeworks': 'nope'}
+            payload = json.dumps(data).encode()
+            # Ответ отдаётся кусками, как при stream=True.
+            response.iter_content = lambda size: [
+                payload[i:i + 7] for i in range(0, len(payload), 7)
+            ]
+            response.close = lambda: closed.append(token)
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenants = [
+            engine.Tenant('shared', 'chat1', timestamp=0),
+            engine.Tenant('shared', 'chat2', timestamp=0),
+            engine.Tenant('own', 'chat3', timestamp=0),
+            engine.Tenant('broken', 'chat4', timestamp=0),
+        ]
+        path = str(tmp_path / 'state.log')
+        store = LogCheckpointStore(path)
+        backfill = Backfill(tenants, store, concurrency=2, rate=1000)
+        assert backfill.run() == 1
+        store.close()
+
+        assert sorted(requested) == [
+            ('OAuth broken', 0), ('OAuth own', 0), ('OAuth shared', 0)
+        ], 'Историю нужно запрашивать с from_date=0, один раз на токен.'
+        saved = LogCheckpointStore(path).load_all()
+        assert set(saved) == {tenant.key for tenant in tenants[:3]}
+        for tenant in tenants[:3]:
+            checkpoint = saved[tenant.key]
+            assert checkpoint.timestamp == random_timestamp
+            assert checkpoint.snapshot['statuses'] == {
+                '1': 'approved', '2': 'reviewing'
+            }
+        assert (backfill.done, backfill.failed) == (3, 1)
+        assert sorted(closed) == sorted({token for token, _ in requested}), (
+            'Ответ, разобранный потоком, должен закрываться.'
+        )
+        assert backfill.homeworks == 6
+        assert tenants[0].status == 'reviewing'
+
+    def test_broken_stream_leaves_no_history(self, monkeypatch, tmp_path,
+                                             random_timestamp):
+        import engine
+        import history_log
+        from backfill import Backfill
+        from checkpoint import LogCheckpointStore
+
+        payload = json.dumps({
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            ],
+            'current_date': random_timestamp,
+        }).encode()
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            # Соединение обрывается после обеих работ, до current_date.
+            response.iter_content = lambda size: [payload[:-30]]
+            response.close = lambda: None
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        log = history_log.HistoryLog(str(tmp_path / 'history.log'))
+        monkeypatch.setattr(history_log, '_log', log)
+        tenant = engine.Tenant('token', 'chat', timestamp=0)
+        store = LogCheckpointStore(str(tmp_path / 'state.log'))
+        assert Backfill([tenant], store, concurrency=1, rate=1000).run() == 1
+        store.close()
+        assert len(log) == 0, (
+            'Прерванный разбор ответа не должен писать события в журнал: '
+            'при повторе они задвоятся.'
+        )
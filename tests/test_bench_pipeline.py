@@ -0,0 +1,23 @@
+class TestBenchPipeline:
+    def test_short_run_reports_metrics(self):
+        from benchmarks.bench_pipeline import run_scenario
+
+        result = run_scenario(
+            1, tenants=5, interval=0.2, change_rate=20, concurrency=4
+        )
+        assert result['polls_per_sec'] > 0
+        assert result['cycle_p99_ms'] >= result['cycle_p50_ms'] > 0
+        assert result['lag_p50_ms'] > 0, (
+            'Смена статуса на сервере должна дойти до Telegram.'
+        )
+
+    def test_regressions_respect_direction(self):
+        from benchmarks.bench_pipeline import regressions
+
+        baseline = {'polls_per_sec': 100, 'cycle_p99_ms': 10}
+        assert regressions(
+            {'polls_per_sec': 70, 'cycle_p99_ms': 8}, baseline
+        ) == ['polls_per_sec']
+        assert regressions(
+            {'polls_per_sec': 130, 'cycle_p99_ms': 13}, baseline
+        ) == ['cycle_p99_ms']
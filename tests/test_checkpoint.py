@@ -0,0 +1,136 @@
+import pytest
+
+
+@pytest.fixture(params=['sqlite', 'log'])
+def store_factory(request, tmp_path):
+    import checkpoint
+
+    def factory(**kwargs):
+        return checkpoint.BACKENDS[request.param](
+            str(tmp_path / 'state'), **kwargs
+        )
+    return factory
+
+
+class TestCheckpointStore:
+    def test_roundtrip_after_reopen(self, store_factory):
+        from checkpoint import Checkpoint
+
+        store = store_factory()
+        store.save('a', Checkpoint(1, 'reviewing', 'msg a'))
+        store.save('b', Checkpoint(2, None, ''))
+        store.save('a', Checkpoint(3, 'approved', 'msg a2'))
+        store.close()
+
+        restored = store_factory().load_all()
+        assert restored == {
+            'a': Checkpoint(3, 'approved', 'msg a2'),
+            'b': Checkpoint(2, None, ''),
+        }, 'После перезапуска должно восстанавливаться последнее состояние.'
+
+    def test_save_is_batched(self, store_factory):
+        from checkpoint import Checkpoint
+
+        store = store_factory(batch_size=3, flush_interval=3600)
+        store.save('a', Checkpoint(1, None, ''))
+        store.save('b', Checkpoint(1, None, ''))
+        assert store_factory().load_all() == {}, (
+            'До заполнения пачки состояния не должны писаться на диск.'
+        )
+        store.save('c', Checkpoint(1, None, ''))
+        assert len(store_factory().load_all()) == 3
+
+    def test_log_compaction(self, tmp_path):
+        from checkpoint import Checkpoint, LogCheckpointStore
+
+        path = tmp_path / 'state.log'
+        store = LogCheckpointStore(str(path), batch_size=1)
+        for timestamp in range(50):
+            store.save('a', Checkpoint(timestamp, None, ''))
+        store.close()
+        assert len(path.read_text().splitlines()) <= 4
+        assert LogCheckpointStore(str(path)).load_all()['a'].timestamp == 49
+
+
+class TestEngineRestore:
+    def test_engine_restores_tenants(self, tmp_path):
+        import engine
+        from checkpoint import Checkpoint, SQLiteCheckpointStore
+
+        path = str(tmp_path / 'state.db')
+        tenant = engine.Tenant('token', 'chat')
+        store = SQLiteCheckpointStore(path)
+        store.save(tenant.key, Checkpoint(42, 'reviewing', 'old'))
+        store.close()
+
+        tenant = engine.Tenant('token', 'chat')
+        engine.PollingEngine(
+            None, [tenant], store=SQLiteCheckpointStore(path)
+        ).restore()
+        assert (tenant.timestamp, tenant.status) == (42, 'reviewing')
+        assert tenant.message_fingerprint == engine.fingerprint('old'), (
+            'Текст сообщения из старой контрольной точки должен '
+            'превращаться в отпечаток.'
+        )
+
+    def test_fingerprint_survives_checkpoint(self, tmp_path):
+        import engine
+        from checkpoint import SQLiteCheckpointStore
+
+        path = str(tmp_path / 'state.db')
+        tenant = engine.Tenant('token', 'chat')
+        tenant.record_cycle('Изменился статус', 'approved')
+        store = SQLiteCheckpointStore(path)
+        store.save(tenant.key, tenant.checkpoint())
+        store.close()
+
+        restored = engine.Tenant('token', 'chat')
+        restored.restore(
+            SQLiteCheckpointStore(path).load_all()[tenant.key]
+        )
+        assert restored.message_fingerprint == tenant.message_fingerprint
+
+    def test_failed_flush_keeps_batch(self, tmp_path):
+        import sqlite3
+
+        from checkpoint import Checkpoint, SQLiteCheckpointStore
+        from outbox import OutboxBatch
+
+        class FlakyStore(SQLiteCheckpointStore):
+            failures = 1
+
+            def _commit(self, items, messages, delivered):
+                if self.failures:
+                    self.failures -= 1
+                    raise sqlite3.OperationalError('database is locked')
+                super()._commit(items, messages, delivered)
+
+        path = str(tmp_path / 'state.db')
+        store = FlakyStore(path)
+        batch = OutboxBatch('a', 0)
+        batch.send_message(1, 'x')
+        store.save('a', Checkpoint(1, None, ''), batch.messages)
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+        store.flush()
+        reopened = SQLiteCheckpointStore(path)
+        assert reopened.load_all() == {'a': Checkpoint(1, None, '')}
+        assert reopened.pending_messages() == batch.messages, (
+            'Пачка, запись которой упала, должна уйти со следующей записью.'
+        )
+
+    def test_engine_survives_failed_flush(self):
+        import engine
+        from checkpoint import NullCheckpointStore
+
+        class BrokenStore(NullCheckpointStore):
+            def _write(self, items):
+                raise OSError('диск недоступен')
+
+        store = BrokenStore()
+        polling = engine.PollingEngine(None, [], store=store)
+        store.save('a', engine.Tenant('token', 'chat').checkpoint())
+        polling.flush_store(store.flush)
+        assert 'a' in store._pending, (
+            'Сбой записи не должен останавливать опрос и терять состояние.'
+        )
@@ -0,0 +1,97 @@
+import requests
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    def make(self, clock, **kwargs):
+        from circuit_breaker import CircuitBreaker
+        kwargs.setdefault('threshold', 3)
+        kwargs.setdefault('base_delay', 10)
+        kwargs.setdefault('max_delay', 40)
+        return CircuitBreaker(jitter=0, clock=clock, **kwargs)
+
+    def test_opens_after_threshold(self):
+        from circuit_breaker import OPEN
+        clock = Clock()
+        breaker = self.make(clock)
+        assert [breaker.record_failure() for _ in range(3)] == [
+            False, False, True
+        ], 'Сбой должен начинаться ровно один раз, на пороге.'
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.retry_after() == 10
+
+    def test_half_open_lets_single_probe(self):
+        clock = Clock()
+        breaker = self.make(clock, threshold=1)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+        assert not breaker.allow(), (
+            'В полуоткрытом состоянии проходит один пробный запрос.'
+        )
+        assert breaker.record_success()
+        assert breaker.allow()
+
+    def test_failed_probe_doubles_delay(self):
+        clock = Clock()
+        breaker = self.make(clock, threshold=1)
+        delays = []
+        for _ in range(4):
+            breaker.record_failure()
+            delays.append(breaker.retry_after())
+            clock.now += delays[-1]
+            assert breaker.allow()
+        assert delays == [10, 20, 40, 40]
+
+    def test_late_failures_do_not_extend_open(self):
+        clock = Clock()
+        breaker = self.make(clock, threshold=1)
+        breaker.record_failure()
+        assert not breaker.record_failure()
+        assert breaker.retry_after() == 10
+
+    def test_user_errors_are_not_outages(self):
+        from circuit_breaker import is_outage
+        from exception import RequestUnclear, ResponseCodeNotCorrect
+        assert is_outage(RequestUnclear('нет сети'))
+        assert is_outage(ResponseCodeNotCorrect('', status_code=503))
+        assert not is_outage(ResponseCodeNotCorrect('', status_code=401))
+        assert not is_outage(KeyError('status'))
+
+
+class TestOutageNotification:
+    def test_single_notification_for_all_tenants(self, monkeypatch):
+        import engine
+        from circuit_breaker import CircuitBreaker
+
+        def broken_get(*args, **kwargs):
+            raise requests.ConnectionError('нет сети')
+
+        sent = []
+        monkeypatch.setattr(requests, 'get', broken_get)
+        monkeypatch.setattr(engine, 'OUTAGE_CHAT_ID', 'admin')
+        monkeypatch.setattr(
+            engine, 'send_message', lambda bot, text: sent.append(text)
+        )
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(chat_id)
+
+        breaker = CircuitBreaker(threshold=3)
+        for i in range(10):
+            engine.run_cycle(
+                Bot(), engine.Tenant(f'token{i}', f'chat{i}'),
+                breaker=breaker,
+            )
+        assert sent == ['admin'], (
+            'О сбое API должно уходить одно общее уведомление.'
+        )
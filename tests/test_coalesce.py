@@ -0,0 +1,140 @@
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from test_engine import run_round
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_result(self):
+        from coalesce import SingleFlight
+
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'current_date': 1}
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('key', slow))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, 'Одинаковые запросы должны объединяться.'
+        assert len(results) == 5
+        assert all(result is results[0] for result in results)
+        assert flight.shared == 4
+
+    def test_error_shared_and_not_cached(self):
+        from coalesce import SingleFlight
+
+        flight = SingleFlight()
+
+        def broken():
+            raise ValueError('сбой')
+
+        with pytest.raises(ValueError):
+            flight.do('key', broken)
+        assert flight.do('key', lambda: 'ok') == 'ok', (
+            'Завершённый вызов не должен запоминаться.'
+        )
+
+
+class TestSharedToken:
+    def test_one_request_for_all_subscribers(self, monkeypatch,
+                                             random_timestamp):
+        import engine as engine_module
+
+        requested = []
+
+        def mock_get(*args, **kwargs):
+            requested.append(kwargs['params']['from_date'])
+            time.sleep(0.05)
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sent = []
+        bot = utils.MockTelegramBot()
+        bot.send_message = lambda chat_id, text: sent.append(chat_id)
+        tenants = [
+            engine_module.Tenant('shared', chat, timestamp=0)
+            for chat in ('student', 'mentor', 'group')
+        ]
+        run_round(engine_module.PollingEngine(bot, tenants))
+        assert requested == [0], (
+            'Чаты с общим токеном должны делить один запрос к API.'
+        )
+        assert sorted(sent) == ['group', 'mentor', 'student'], (
+            'Ответ должен доходить до каждого чата-подписчика.'
+        )
+
+    def test_subscribers_with_different_dates_share_request(
+            self, monkeypatch, random_timestamp):
+        import engine as engine_module
+
+        requested = []
+
+        def mock_get(*args, **kwargs):
+            requested.append(kwargs['params']['from_date'])
+            time.sleep(0.05)
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        sent = []
+        bot = utils.MockTelegramBot()
+        bot.send_message = lambda chat_id, text: sent.append(chat_id)
+        tenants = [
+            engine_module.Tenant('shared', 'student', timestamp=200),
+            engine_module.Tenant('shared', 'mentor', timestamp=100),
+        ]
+        engine = engine_module.PollingEngine(bot, tenants)
+        run_round(engine)
+        assert requested == [100], (
+            'Подписчики с разными датами должны делить один запрос '
+            'с самой ранней датой.'
+        )
+        assert sorted(sent) == ['mentor', 'student']
+        assert [tenant.timestamp for tenant in tenants] == [
+            random_timestamp, random_timestamp
+        ], 'После общего ответа даты подписчиков должны совпадать.'
+        assert engine._group_dates == {}
+
+    def test_due_subscriber_pulls_others(self):
+        import engine as engine_module
+
+        first, second = (
+            engine_module.Tenant('shared', chat) for chat in ('a', 'b')
+        )
+        other = engine_module.Tenant('own', 'c')
+        engine = engine_module.PollingEngine(None, [first, second, other])
+        engine.scheduler.add(second, 600)
+        engine.scheduler.add(other, 600)
+        assert list(engine.with_subscribers([first])) == [first, second]
+        assert second not in engine.scheduler
+        assert other in engine.scheduler
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+class Bot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def api_not_called(*args, **kwargs):
+    raise AssertionError('Команды не должны обращаться к API.')
+
+
+class TestCommandService:
+    def make(self, monkeypatch):
+        from commands import CommandService
+        from engine import Tenant
+
+        monkeypatch.setattr(requests, 'get', api_not_called)
+        tenant = Tenant('token', 100)
+        bot = Bot()
+        return CommandService([tenant], bot, clock=lambda: 0), tenant, bot
+
+    def test_status_from_snapshot(self, monkeypatch):
+        service, tenant, bot = self.make(monkeypatch)
+        tenant.snapshot.update(
+            {'id': 7, 'homework_name': 'hw7', 'status': 'approved'}
+        )
+        service.handle('status', '100')
+        assert bot.sent == [(
+            '100', '"hw7": Работа проверена: ревьюеру всё понравилось. Ура!'
+        )]
+
+    def test_history_sorted_by_time(self, monkeypatch):
+        service, tenant, bot = self.make(monkeypatch)
+        tenant.history.extend([(20, 'b', 'approved'), (10, 'a', 'reviewing')])
+        service.handle('history', '100')
+        lines = bot.sent[0][1].splitlines()
+        assert [line.split(' "')[1][0] for line in lines] == ['a', 'b']
+
+    def test_unknown_chat_ignored(self, monkeypatch):
+        service, tenant, bot = self.make(monkeypatch)
+        service.handle('status', '999')
+        assert bot.sent == []
+
+    def test_mute_for_hours(self, monkeypatch):
+        service, tenant, bot = self.make(monkeypatch)
+        service.handle('mute', '100', ['2'])
+        assert tenant.muted_until == 7200
+        service.handle('unmute', '100')
+        assert tenant.muted_until == 0
+
+    @pytest.mark.parametrize('hours', ['nan', 'inf', '1e9', '-5', '0', 'x'])
+    def test_mute_rejects_bad_hours(self, monkeypatch, hours):
+        from commands import MUTE_USAGE
+
+        service, tenant, bot = self.make(monkeypatch)
+        service.handle('mute', '100', [hours])
+        assert bot.sent[0][1] == MUTE_USAGE
+        assert not tenant.muted, (
+            'Неверный срок не должен отключать уведомления.'
+        )
+
+
+class TestMutedTenant:
+    def test_changes_recorded_but_not_sent(self, monkeypatch,
+                                           random_timestamp):
+        import engine
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = Bot()
+        tenant = engine.Tenant('token', 'chat', timestamp=0)
+        tenant.muted_until = float('inf')
+        engine.run_cycle(bot, tenant)
+        assert bot.sent == []
+        assert tenant.snapshot.statuses == {'hw': 'approved'}
+        assert [name for _, name, _ in tenant.history] == ['hw']
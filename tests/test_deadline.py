@@ -0,0 +1,168 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+import requests
+
+import utils
+
+
+class FakeLatency:
+    def __init__(self, p95, count=1000):
+        self.p95 = p95
+        self.observations = count
+        self.attempts = 0
+
+    def count(self):
+        return self.observations
+
+    @contextmanager
+    def time(self):
+        yield
+        self.attempts += 1
+
+    def quantile(self, q):
+        return self.p95
+
+
+class TestBudget:
+    def test_timeouts_clipped_to_budget(self):
+        import deadline
+
+        assert deadline.request_timeout(3, 10) == (3, 10)
+        with deadline.budget(0.5):
+            connect, read = deadline.request_timeout(3, 10)
+            assert 0 < connect <= 0.5 and 0 < read <= 0.5
+        with deadline.budget(0.001):
+            time.sleep(0.01)
+            with pytest.raises(deadline.RequestTimeout):
+                deadline.request_timeout()
+
+    def test_request_api_passes_timeout(self, monkeypatch,
+                                        random_timestamp):
+        import homework
+
+        seen = []
+
+        def mock_get(*args, **kwargs):
+            seen.append(kwargs.get('timeout'))
+            return utils.MockResponseGET(random_timestamp=random_timestamp)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        homework.get_api_answer(0)
+        assert seen and seen[0] is not None, (
+            'Запрос к API должен уходить с таймаутом.'
+        )
+
+    def test_hung_request_bounded_by_budget(self):
+        import deadline
+
+        release = threading.Event()
+        hedger = deadline.Hedger(enabled=False, workers=2)
+        started = time.monotonic()
+        with deadline.budget(0.1):
+            with pytest.raises(deadline.RequestTimeout):
+                hedger.call(lambda: release.wait(5))
+        release.set()
+        assert time.monotonic() - started < 1, (
+            'Зависший запрос не должен держать цикл дольше бюджета.'
+        )
+
+
+    def test_queued_attempt_cancelled_on_timeout(self):
+        import deadline
+
+        release = threading.Event()
+        calls = []
+        hedger = deadline.Hedger(enabled=False, workers=1)
+        busy = hedger._submit(lambda: release.wait(5))
+        with deadline.budget(0.1):
+            with pytest.raises(deadline.RequestTimeout):
+                hedger.call(lambda: calls.append(1))
+        release.set()
+        busy.result()
+        hedger.close()
+        assert calls == [], (
+            'Попытка, не начатая до исчерпания бюджета, не должна '
+            'уходить в API.'
+        )
+
+
+class TestHedger:
+    def test_slow_first_attempt_is_hedged(self):
+        import deadline
+
+        attempts = []
+        lock = threading.Lock()
+
+        def request():
+            with lock:
+                attempts.append(None)
+                number = len(attempts)
+            if number == 1:
+                time.sleep(1)
+                return 'slow'
+            return 'fast'
+
+        hedger = deadline.Hedger(
+            enabled=True, latency=FakeLatency(0.05), workers=2
+        )
+        started = time.monotonic()
+        assert hedger.call(request) == 'fast'
+        assert time.monotonic() - started < 0.5
+        assert len(attempts) == 2
+        time.sleep(1.2)
+        assert hedger.latency.attempts == 2, (
+            'Задержка должна записываться для каждой попытки.'
+        )
+
+    def test_fast_request_is_not_hedged(self):
+        import deadline
+
+        attempts = []
+        hedger = deadline.Hedger(
+            enabled=True, latency=FakeLatency(0.5), workers=2
+        )
+        assert hedger.call(lambda: attempts.append(1) or 'ok') == 'ok'
+        assert attempts == [1]
+
+    def test_error_of_one_attempt_waits_for_other(self):
+        import deadline
+
+        calls = []
+
+        def request():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise requests.ConnectionError('reset')
+            time.sleep(0.2)
+            return 'ok'
+
+        hedger = deadline.Hedger(
+            enabled=True, latency=FakeLatency(0.05), workers=2
+        )
+        assert hedger.call(request) == 'ok'
+
+    def test_no_hedge_until_enough_samples(self):
+        import deadline
+
+        hedger = deadline.Hedger(
+            enabled=True, latency=FakeLatency(0.05, count=3), min_samples=10
+        )
+        assert hedger.delay() is None
+
+
+class TestHistogramQuantile:
+    def test_interpolates_within_bucket(self):
+        from metrics import Histogram, Registry
+
+        histogram = Histogram(
+            'test_latency', 'Тест.', buckets=(1, 2, 4), registry=Registry()
+        )
+        assert histogram.quantile(0.95) is None
+        for value in [0.5] * 50 + [1.5] * 50:
+            histogram.observe(value)
+        assert histogram.quantile(0.5) == 1
+        assert histogram.quantile(0.75) == 1.5
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import telegram
+
+
+class RecordingBot:
+    def __init__(self, errors=()):
+        self.sent = []
+        self.errors = list(errors)
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            if self.errors:
+                raise self.errors.pop(0)
+            self.sent.append((chat_id, text, time.monotonic()))
+
+
+class TestTokenBucket:
+    def test_reserve_returns_wait_time(self):
+        from delivery import TokenBucket
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: 0)
+        assert [bucket.reserve(0) for _ in range(4)] == [0, 0, 0.5, 1.0]
+        assert bucket.reserve(10) == 0
+
+
+class TestDeliveryQueue:
+    def make(self, bot, **kwargs):
+        from delivery import DeliveryQueue
+        kwargs.setdefault('workers', 2)
+        kwargs.setdefault('retry_backoff', 0)
+        return DeliveryQueue(bot, **kwargs)
+
+    def test_send_message_does_not_block(self, homework_module):
+        bot = RecordingBot()
+        queue = self.make(bot)
+        homework_module.send_message(queue, 'не отправлено')
+        assert len(queue) == 1 and bot.sent == [], (
+            'send_message через очередь должен только ставить сообщение.'
+        )
+        queue.start()
+        assert queue.close(timeout=5)
+        assert len(bot.sent) == 1
+
+    def test_burst_to_one_chat_merged(self):
+        bot = RecordingBot()
+        queue = self.make(bot, chat_rate=0.5)
+        for number in range(5):
+            queue.send_message('chat', f'm{number}')
+        queue.send_message('other', 'x')
+        queue.start()
+        assert queue.close(timeout=5)
+        chat_texts = [text for chat, text, _ in bot.sent if chat == 'chat']
+        assert chat_texts == ['m0\n\nm1\n\nm2\n\nm3\n\nm4'], (
+            'Сообщения одного чата должны склеиваться в одно.'
+        )
+
+    def test_chat_rate_limit(self):
+        bot = RecordingBot()
+        queue = self.make(bot, chat_rate=10).start()
+        queue.send_message('chat', 'a')
+        assert queue.join(timeout=5)
+        queue.send_message('chat', 'b')
+        assert queue.close(timeout=5)
+        (_, _, first), (_, _, second) = bot.sent
+        assert second - first >= 0.09, 'Нарушен лимит сообщений на чат.'
+
+    def test_chat_rate_counts_from_actual_send(self):
+        queue = self.make(RecordingBot(), chat_rate=10)
+        sent_at = time.monotonic() + 1
+        # Прошлая отправка задержалась общим лимитом и ушла позже.
+        queue._sent_at['chat'] = sent_at
+        queue.send_message('chat', 'a')
+        not_before, _, _ = queue._ready[0]
+        assert not_before >= sent_at + 0.1, (
+            'Пауза чата должна отсчитываться от фактической отправки.'
+        )
+
+    def test_retry_on_telegram_error(self):
+        bot = RecordingBot(errors=[
+            telegram.error.NetworkError('сеть'),
+            telegram.error.RetryAfter(0),
+        ])
+        queue = self.make(bot).start()
+        queue.send_message('chat', 'a')
+        assert queue.close(timeout=5)
+        assert [text for _, text, _ in bot.sent] == ['a'], (
+            'При ошибке Telegram отправка должна повторяться.'
+        )
+
+    def test_permanent_error_not_retried(self):
+        bot = RecordingBot(errors=[telegram.error.BadRequest('нет чата')])
+        queue = self.make(bot).start()
+        queue.send_message('chat', 'a')
+        assert queue.close(timeout=5)
+        assert bot.sent == [] and bot.errors == []
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+from http import HTTPStatus
+
+import requests
+
+import utils
+
+
+def run_round(engine):
+    async def go():
+        engine.start()
+        await engine.run_round()
+    asyncio.run(go())
+
+
+class TestPollingEngine:
+    def make_tenants(self, engine_module, count):
+        return [
+            engine_module.Tenant(f'token{i}', f'chat{i}', timestamp=0)
+            for i in range(count)
+        ]
+
+    def test_each_tenant_polled_with_own_token(self, monkeypatch,
+                                                random_timestamp):
+        import engine as engine_module
+
+        seen_headers = []
+
+        def mock_get(*args, **kwargs):
+            seen_headers.append(kwargs['headers']['Authorization'])
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = utils.MockTelegramBot()
+        sent = []
+        bot.send_message = lambda chat_id, text: sent.append(chat_id)
+        tenants = self.make_tenants(engine_module, 5)
+        run_round(engine_module.PollingEngine(bot, tenants, concurrency=2))
+
+        assert sorted(seen_headers) == sorted(
+            f'OAuth token{i}' for i in range(5)
+        ), 'Каждый пользователь должен опрашиваться со своим токеном.'
+        assert sorted(sent) == sorted(f'chat{i}' for i in range(5)), (
+            'Сообщение должно уходить в чат своего пользователя.'
+        )
+        assert all(t.timestamp == random_timestamp for t in tenants), (
+            'После опроса timestamp пользователя должен обновиться.'
+        )
+
+    def test_concurrency_limit(self, monkeypatch, random_timestamp):
+        import engine as engine_module
+
+        lock = threading.Lock()
+        state = {'now': 0, 'peak': 0}
+
+        def slow_get(*args, **kwargs):
+            with lock:
+                state['now'] += 1
+                state['peak'] = max(state['peak'], state['now'])
+            time.sleep(0.01)
+            with lock:
+                state['now'] -= 1
+            return utils.MockResponseGET(random_timestamp=random_timestamp)
+
+        monkeypatch.setattr(requests, 'get', slow_get)
+        tenants = self.make_tenants(engine_module, 20)
+        engine = engine_module.PollingEngine(
+            utils.MockTelegramBot(), tenants, concurrency=3
+        )
+        run_round(engine)
+
+        assert 0 < state['peak'] <= 3, (
+            'Число одновременных запросов не должно превышать concurrency.'
+        )
+
+    def test_tenant_is_compact(self):
+        import engine as engine_module
+
+        tenant = engine_module.Tenant('token', 'chat', timestamp=0)
+        assert not hasattr(tenant, '__dict__')
+        assert tenant.headers == {'Authorization': 'OAuth token'}
+        assert tenant.record_error('Сбой')
+        assert not tenant.record_error('Сбой'), (
+            'О повторяющейся ошибке не нужно сообщать второй раз.'
+        )
+        assert tenant.record_error('Другой сбой')
@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture
+def log(tmp_path):
+    from history_log import HistoryLog
+
+    log = HistoryLog(str(tmp_path / 'history.log'))
+    yield log
+    log.close()
+
+
+class TestHistoryLog:
+    def test_range_query_per_tenant(self, log):
+        for timestamp in (10, 20, 30):
+            log.append('a', 1, 'reviewing', timestamp)
+            log.append('b', 1, 'approved', timestamp)
+        events = log.events('a', 15, 30)
+        assert [event.timestamp for event in events] == [20]
+        assert events[0].status == 'reviewing'
+        assert events[0].homework == 1
+
+    def test_reopen_repairs_torn_record(self, log, tmp_path):
+        from history_log import HistoryLog
+
+        log.append('a', 'hw', 'approved', 10)
+        log.close()
+        path = tmp_path / 'history.log'
+        with open(path, 'ab') as file:
+            file.write(b'\0' * 5)
+        reopened = HistoryLog(str(path))
+        reopened.append('a', 'hw', 'rejected', 20)
+        assert [event.status for event in reopened.events('a')] == [
+            'approved', 'rejected'
+        ]
+        reopened.close()
+
+    def test_compact_keeps_transitions_and_current_status(self, log):
+        for timestamp, status in (
+            (10, 'reviewing'), (20, 'reviewing'), (30, 'approved'),
+            (40, 'approved'),
+        ):
+            log.append('a', 1, status, timestamp)
+        log.append('a', 2, 'reviewing', 5)
+        assert log.compact(retention=75, now=100) == 2
+        events = log.events('a')
+        assert [(event.homework, event.timestamp) for event in events] == [
+            (2, 5), (1, 30)
+        ], 'Старые события уходят, но последний статус работы остаётся.'
+
+    def test_review_durations(self, log):
+        log.append('a', 1, 'reviewing', 100)
+        log.append('a', 1, 'rejected', 160)
+        log.append('a', 1, 'reviewing', 200)
+        log.append('a', 1, 'approved', 230)
+        assert log.review_durations('a') == {1: 90}
+
+
+class TestNotifyRecords:
+    def test_changes_written_to_installed_log(self, monkeypatch, log,
+                                              homework_module):
+        import history_log
+        from status_diff import StatusSnapshot
+
+        monkeypatch.setattr(history_log, '_log', log)
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: None)
+        homework_module.notify_changes(
+            None, StatusSnapshot(),
+            [{'id': 7, 'homework_name': 'hw', 'status': 'approved'}],
+            0, 50,
+        )
+        events = log.events(homework_module.get_tenant_key())
+        assert [(event.homework, event.status) for event in events] == [
+            (7, 'approved')
+        ]
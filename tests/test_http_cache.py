@@ -0,0 +1,54 @@
+import json
+
+from tests.fixtures.fixture_server import json_response
+
+
+class TestResponseCache:
+    def test_etag_revalidation(self, monkeypatch, api_server,
+                               homework_module):
+        from http_cache import ResponseCache, Unchanged
+
+        def respond(request):
+            if request.headers.get('If-None-Match') == '"v1"':
+                return 304, {'ETag': '"v1"'}, b''
+            return json_response(
+                {'homeworks': [], 'current_date': 5}, headers={'ETag': '"v1"'}
+            )
+
+        api_server.respond = respond
+        monkeypatch.setattr(homework_module, 'ENDPOINT', api_server.url)
+        cache = ResponseCache()
+        assert cache.get_api_answer(0) == {'homeworks': [],
+                                           'current_date': 5}
+        assert cache.get_api_answer(5) == Unchanged(None)
+        stats = cache.stats()
+        assert stats['misses'] == 1 and stats['not_modified'] == 1
+        assert stats['bytes_saved'] > 0
+
+    def test_fingerprint_ignores_current_date(self, monkeypatch, api_server,
+                                              homework_module):
+        from http_cache import ResponseCache, Unchanged
+
+        dates = iter(range(10, 20))
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        api_server.respond = lambda request: json_response(
+            {'homeworks': homeworks, 'current_date': next(dates)}
+        )
+        monkeypatch.setattr(homework_module, 'ENDPOINT', api_server.url)
+        cache = ResponseCache()
+        assert isinstance(cache.get_api_answer(0), dict)
+        assert cache.get_api_answer(10) == Unchanged(11), (
+            'Ответ, отличающийся только current_date, не должен разбираться.'
+        )
+        homeworks[0]['status'] = 'rejected'
+        assert cache.get_api_answer(11)['homeworks'] == homeworks
+        assert cache.stats()['unchanged'] == 1
+
+    def test_fingerprint_skips_escaped_key(self):
+        from http_cache import fingerprint
+
+        body = json.dumps({
+            'homeworks': [{'reviewer_comment': '"current_date": 1'}],
+            'current_date': 7,
+        }).encode()
+        assert fingerprint(body)[1] == 7
@@ -0,0 +1,26 @@
+class TestManagedSession:
+    def test_connection_reused(self, api_server):
+        import http_session
+
+        session = http_session.ManagedSession(pool_size=2)
+        for _ in range(5):
+            assert session.get(api_server.url).json()['current_date'] == 1
+        session.close()
+
+        stats = session.stats.snapshot()
+        assert stats['requests'] == 5
+        assert stats['handshakes'] == 1, (
+            'Keep-alive сессия должна открывать одно соединение.'
+        )
+        assert stats['reused'] == 4
+
+    def test_http_get_uses_installed_session(self, monkeypatch, api_server):
+        import http_session
+
+        session = http_session.ManagedSession()
+        monkeypatch.setattr(http_session, '_session', None)
+        http_session.install_session(session)
+        http_session.http_get(api_server.url)
+        assert session.stats.snapshot()['requests'] == 1, (
+            'http_get должен использовать установленную сессию.'
+        )
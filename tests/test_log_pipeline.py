@@ -0,0 +1,65 @@
+import io
+import logging
+import threading
+
+
+class CountingStr:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return 'x' * 1000
+
+
+class TestLogPipeline:
+    def test_truncated_is_lazy(self):
+        from log_pipeline import Truncated
+
+        payload = CountingStr()
+        logger = logging.getLogger('test_truncated_is_lazy')
+        logger.setLevel(logging.INFO)
+        logger.debug('Ответ API: %s', Truncated(payload))
+        assert payload.calls == 0, (
+            'Выключенный уровень не должен строить строку сообщения.'
+        )
+        text = str(Truncated('x' * 1000, limit=10))
+        assert text.startswith('x' * 10 + '...') and '990' in text
+        big = {'homeworks': [{'id': number} for number in range(10000)]}
+        assert len(str(Truncated(big))) < 600
+
+    def test_records_written_by_listener_thread(self):
+        from log_pipeline import start_queue_logging
+
+        stream = io.StringIO()
+        logger = logging.getLogger('test_records_written_by_listener')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        threads = []
+
+        class ThreadRecordingHandler(logging.StreamHandler):
+            def emit(self, record):
+                threads.append(threading.current_thread())
+                super().emit(record)
+
+        logger.addHandler(ThreadRecordingHandler(stream))
+        listener = start_queue_logging(logger)
+        logger.info('сообщение %d', 42)
+        listener.stop()
+
+        assert stream.getvalue() == 'сообщение 42\n'
+        assert threads and threads[0] is not threading.current_thread(), (
+            'Вывод лога должен идти из потока QueueListener.'
+        )
+
+    def test_full_queue_drops_records(self):
+        from log_pipeline import DeferredQueueHandler
+        import queue
+
+        handler = DeferredQueueHandler(queue.Queue(1))
+        logger = logging.getLogger('test_full_queue_drops_records')
+        logger.propagate = False
+        logger.addHandler(handler)
+        for _ in range(3):
+            logger.warning('переполнение')
+        assert handler.dropped == 2
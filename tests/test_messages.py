@@ -0,0 +1,54 @@
+import pytest
+
+
+class TestTemplate:
+    def test_constants_substituted_once(self):
+        from messages import Template
+
+        template = Template('{greeting}, "{name}"!', greeting='Привет')
+        assert template.render(name='мир') == 'Привет, "мир"!'
+        assert template.fields == ('name',), (
+            'Подставленная константа должна склеиться с соседним текстом.'
+        )
+
+    def test_format_spec_rejected(self):
+        from messages import Template
+
+        with pytest.raises(ValueError):
+            Template('{name!r}')
+
+
+class TestMessageCatalog:
+    def test_native_matches_parse_status_format(self, homework_module):
+        catalog = homework_module.MESSAGES
+        for status, verdict in homework_module.HOMEWORK_VERDICTS.items():
+            assert catalog.status_message('hw', status) == (
+                f'Изменился статус проверки работы "hw". {verdict}'
+            )
+
+    def test_identical_messages_cached(self, homework_module):
+        catalog = homework_module.MESSAGES
+        first = catalog.status_message('hw', 'approved', 'en')
+        assert catalog.status_message('hw', 'approved', 'en') is first
+        assert first == (
+            'Homework "hw" status changed. The homework is approved. Hooray!'
+        )
+
+    def test_unknown_locale_falls_back(self, homework_module):
+        catalog = homework_module.MESSAGES
+        assert catalog.verdict('approved', 'xx') == (
+            homework_module.HOMEWORK_VERDICTS['approved']
+        )
+
+    def test_tenant_locale_used(self, homework_module):
+        from engine import Tenant
+
+        tenant = Tenant('token', 'chat', locale='en')
+        token = homework_module.current_tenant.set(tenant)
+        try:
+            message = homework_module.parse_status(
+                {'homework_name': 'hw', 'status': 'rejected'}
+            )
+        finally:
+            homework_module.current_tenant.reset(token)
+        assert message.endswith('The reviewer left some remarks.')
@@ -0,0 +1,62 @@
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import requests
+
+
+class TestMetrics:
+    def test_histogram_render(self):
+        from metrics import Histogram, Registry
+
+        registry = Registry()
+        histogram = Histogram('latency', 'Задержка.', buckets=(0.1, 1),
+                              registry=registry)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+        text = registry.render()
+        assert 'latency_bucket{le="0.1"} 1' in text
+        assert 'latency_bucket{le="1"} 2' in text
+        assert 'latency_bucket{le="+Inf"} 3' in text
+        assert 'latency_count 3' in text
+
+    def test_counter_labels(self):
+        from metrics import Counter, Registry
+
+        registry = Registry()
+        counter = Counter('errors', 'Ошибки.', registry=registry)
+        counter.inc(exception='RequestUnclear')
+        counter.inc(exception='RequestUnclear')
+        assert 'errors_total{exception="RequestUnclear"} 2' in (
+            registry.render()
+        )
+
+    def test_api_error_counted(self, monkeypatch, homework_module):
+        import engine
+        import metrics
+
+        def broken_get(*args, **kwargs):
+            raise requests.RequestException('нет сети')
+
+        monkeypatch.setattr(requests, 'get', broken_get)
+        monkeypatch.setattr(engine, 'send_message', lambda bot, text: None)
+        before = metrics.ERRORS.value(exception='RequestUnclear')
+        cycles = metrics.CYCLE_DURATION.count()
+        engine.run_cycle(None, engine.Tenant('token', 'chat'))
+        assert metrics.ERRORS.value(exception='RequestUnclear') == before + 1
+        assert metrics.CYCLE_DURATION.count() == cycles + 1
+
+    def test_metrics_endpoint(self):
+        from metrics import MetricsHandler
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), MetricsHandler)
+        threading.Thread(target=server.serve_forever, args=(0.05,),
+                              daemon=True).start()
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert '# TYPE homework_api_request_seconds histogram' in body
@@ -0,0 +1,191 @@
+import asyncio
+import threading
+from http import HTTPStatus
+
+import requests
+
+import utils
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            self.sent.append((chat_id, text))
+
+
+def make_store(tmp_path, **kwargs):
+    from checkpoint import SQLiteCheckpointStore
+    return SQLiteCheckpointStore(str(tmp_path / 'state.db'), **kwargs)
+
+
+def make_batch(key, *texts):
+    from outbox import OutboxBatch
+    batch = OutboxBatch(key, 0)
+    for text in texts:
+        batch.send_message(123, text)
+    return batch
+
+
+class TestOutboxStore:
+    def test_messages_sent_only_after_commit(self, tmp_path):
+        from checkpoint import Checkpoint
+        from outbox import Dispatcher
+
+        bot = RecordingBot()
+        store = make_store(tmp_path, flush_interval=3600)
+        Dispatcher(store, bot)
+        store.save('a', Checkpoint(1, None, ''), make_batch('a', 'x').messages)
+        assert bot.sent == [], (
+            'Сообщение не должно уходить до записи состояния.'
+        )
+        store.flush()
+        assert bot.sent == [(123, 'x')]
+        assert make_store(tmp_path).pending_messages() == [], (
+            'Отправленное сообщение должно удаляться из очереди.'
+        )
+
+    def test_unsent_messages_survive_restart(self, tmp_path):
+        from checkpoint import Checkpoint
+        from outbox import Dispatcher
+
+        store = make_store(tmp_path)
+        batch = make_batch('a', 'x', 'y')
+        store.save('a', Checkpoint(1, None, ''), batch.messages)
+        store.close()
+
+        bot = RecordingBot()
+        restarted = make_store(tmp_path)
+        assert restarted.load_all()['a'].timestamp == 1
+        Dispatcher(restarted, bot).recover()
+        assert bot.sent == [(123, 'x'), (123, 'y')], (
+            'Записанные вместе с состоянием сообщения должны '
+            'отправляться после перезапуска по порядку.'
+        )
+        assert make_store(tmp_path).pending_messages() == []
+
+    def test_same_cycle_is_enqueued_once(self, tmp_path):
+        from checkpoint import Checkpoint
+
+        store = make_store(tmp_path)
+        store.save('a', Checkpoint(1, None, ''), make_batch('a', 'x').messages)
+        store.save('a', Checkpoint(1, None, ''), make_batch('a', 'x').messages)
+        store.flush()
+        assert len(store.pending_messages()) == 1, (
+            'Повтор цикла с тем же ключом сообщения не должен его дублировать.'
+        )
+
+    def test_delivered_marks_are_batched(self, tmp_path):
+        from checkpoint import Checkpoint
+
+        store = make_store(tmp_path, flush_interval=3600)
+        messages = make_batch('a', 'x', 'y').messages
+        store.save('a', Checkpoint(1, None, ''), messages)
+        store.flush()
+        store.mark_delivered(messages[0].id)
+        assert store.pending_messages() == messages[1:], (
+            'Отмеченное сообщение не должно повторяться до записи пачки.'
+        )
+        assert len(make_store(tmp_path).pending_messages()) == 2
+        store.flush()
+        assert make_store(tmp_path).pending_messages() == messages[1:]
+
+    def test_recover_selects_own_tenants(self, tmp_path):
+        from checkpoint import Checkpoint
+        from outbox import Dispatcher
+
+        # Процесс A записал сообщение, но ещё не отправил его.
+        worker_a = make_store(tmp_path)
+        worker_a.save('a', Checkpoint(1, None, ''),
+                      make_batch('a', 'hello').messages)
+        worker_a.flush()
+
+        bot = RecordingBot()
+        Dispatcher(make_store(tmp_path), bot).recover(
+            accept=lambda key: key == 'b'
+        )
+        assert bot.sent == [], (
+            'Процесс не должен досылать сообщения чужих пользователей.'
+        )
+        Dispatcher(make_store(tmp_path), bot).recover(
+            accept=lambda key: key == 'a'
+        )
+        assert bot.sent == [(123, 'hello')]
+
+
+class TestDispatcher:
+    def test_queue_marks_delivered_and_recover_skips_in_flight(self,
+                                                              tmp_path):
+        from checkpoint import Checkpoint
+        from delivery import DeliveryQueue
+        from outbox import Dispatcher
+
+        bot = RecordingBot()
+        queue = DeliveryQueue(bot, workers=1)
+        store = make_store(tmp_path)
+        dispatcher = Dispatcher(store, queue, queued=True)
+        store.save('a', Checkpoint(1, None, ''), make_batch('a', 'x').messages)
+        store.flush()
+        dispatcher.recover()
+        assert len(queue) == 1, (
+            'recover не должен ставить повторно сообщение, ждущее отправки.'
+        )
+        queue.start()
+        assert queue.close(timeout=5)
+        store.flush()
+        assert bot.sent == [(123, 'x')]
+        assert make_store(tmp_path).pending_messages() == []
+
+    def test_engine_enqueues_cycle_messages(self, monkeypatch, tmp_path,
+                                            random_timestamp):
+        import engine
+
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(
+                random_timestamp=random_timestamp, http_status=HTTPStatus.OK
+            )
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = RecordingBot()
+        store = make_store(tmp_path, flush_interval=3600)
+        polling = engine.PollingEngine(
+            bot, [engine.Tenant('token', 'chat', timestamp=0)], store=store
+        )
+
+        async def go():
+            polling.start()
+            await polling.run_round()
+        asyncio.run(go())
+        assert bot.sent == [], (
+            'Сообщения цикла должны ждать записи состояния.'
+        )
+        store.close()
+        assert [chat_id for chat_id, _ in bot.sent] == ['chat']
+        assert make_store(tmp_path).pending_messages() == []
+
+    def test_recover_while_finishing_does_not_resend(self, tmp_path):
+        from checkpoint import Checkpoint, SQLiteCheckpointStore
+        from outbox import Dispatcher
+
+        class RecoveringStore(SQLiteCheckpointStore):
+            def mark_delivered(self, message_id):
+                super().mark_delivered(message_id)
+                dispatcher.recover()
+
+        bot = RecordingBot()
+        store = RecoveringStore(str(tmp_path / 'state.db'))
+        dispatcher = Dispatcher(store, bot)
+        store.save('a', Checkpoint(1, None, ''), make_batch('a', 'x').messages)
+        store.flush()
+        assert bot.sent == [(123, 'x')], (
+            'recover() во время отметки о доставке не должен повторять '
+            'сообщение.'
+        )
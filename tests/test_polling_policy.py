@@ -0,0 +1,46 @@
+class Tenant:
+    def __init__(self, status=None):
+        self.status = status
+        self.interval = 0
+        self.interval_status = None
+
+
+class TestAdaptivePolicy:
+    def make(self, **kwargs):
+        from polling_policy import AdaptivePolicy
+        kwargs.setdefault('max_interval', 3600)
+        kwargs.setdefault('backoff_factor', 2)
+        return AdaptivePolicy(**kwargs)
+
+    def test_reviewing_polled_faster(self):
+        from polling_policy import REVIEWING_INTERVAL
+        policy = self.make()
+        tenant = Tenant('reviewing')
+        for _ in range(3):
+            assert policy.next_interval(tenant) == REVIEWING_INTERVAL, (
+                'Пока работа на проверке, опрос должен идти чаще.'
+            )
+
+    def test_idle_backs_off_and_resets_on_transition(self):
+        policy = self.make()
+        tenant = Tenant('approved')
+        intervals = [policy.next_interval(tenant) for _ in range(5)]
+        assert intervals == [600, 1200, 2400, 3600, 3600], (
+            'Без работ в полёте интервал должен расти до максимума.'
+        )
+        tenant.status = 'reviewing'
+        assert policy.next_interval(tenant) < 600
+        tenant.status = 'approved'
+        assert policy.next_interval(tenant) == 600
+
+    def test_budget_stretches_intervals(self):
+        policy = self.make(budget_rps=1)
+        tenants = [Tenant('rejected') for _ in range(1200)]
+        delays = [policy.next_interval(tenant) for tenant in tenants]
+        assert abs(policy.total_rate - 2) < 1e-9
+        assert abs(delays[-1] - 1200) < 1e-6, (
+            'При превышении бюджета интервалы должны растягиваться.'
+        )
+        for tenant in tenants:
+            policy.forget(tenant)
+        assert abs(policy.total_rate) < 1e-9
@@ -0,0 +1,60 @@
+import random
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPollScheduler:
+    def make(self, jitter=0.0):
+        from scheduler import PollScheduler
+        clock = FakeClock()
+        return PollScheduler(jitter=jitter, clock=clock,
+                             rng=random.Random(0)), clock
+
+    def test_pop_due_in_deadline_order(self):
+        scheduler, clock = self.make()
+        scheduler.add('b', 20)
+        scheduler.add('a', 10)
+        scheduler.add('c', 30)
+        clock.now = 25
+        assert scheduler.pop_due() == ['a', 'b']
+        assert scheduler.next_deadline() == 30
+        assert len(scheduler) == 1
+
+    def test_reschedule_and_cancel(self):
+        scheduler, clock = self.make()
+        scheduler.add('a', 10)
+        scheduler.add('b', 10)
+        scheduler.reschedule('a', 50)
+        assert scheduler.cancel('b')
+        assert not scheduler.cancel('b')
+        clock.now = 20
+        assert scheduler.pop_due() == [], (
+            'Отменённые и перенесённые сроки не должны срабатывать.'
+        )
+        clock.now = 50
+        assert scheduler.pop_due() == ['a']
+        assert scheduler.next_deadline() is None
+
+    def test_jitter_spreads_deadlines(self):
+        scheduler, clock = self.make(jitter=0.1)
+        for key in range(1000):
+            scheduler.add(key, 600)
+        deadlines = [scheduler._entries[key][0] for key in range(1000)]
+        assert 540 <= min(deadlines) and max(deadlines) <= 660
+        assert len(set(int(d) for d in deadlines)) > 60, (
+            'Сроки должны быть размыты, а не совпадать.'
+        )
+
+    def test_spread_initial_deadlines(self):
+        scheduler, clock = self.make()
+        for key in range(1000):
+            scheduler.add(key, 600, spread=True)
+        clock.now = 60
+        due = scheduler.pop_due()
+        assert 50 < len(due) < 150
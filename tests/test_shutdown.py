@@ -0,0 +1,104 @@
+import asyncio
+import signal
+import time
+
+import pytest
+import requests
+
+import utils
+
+
+class TestShutdown:
+    def test_signal_only_sets_flag_while_busy(self):
+        from shutdown import Shutdown
+
+        shutdown = Shutdown()
+        shutdown.request(signal.SIGTERM)
+        assert shutdown.requested
+
+    def test_signal_interrupts_idle_wait(self):
+        from exception import ShutdownRequested
+        from shutdown import Shutdown
+
+        shutdown = Shutdown()
+        with pytest.raises(ShutdownRequested):
+            with shutdown.idle():
+                shutdown.request(signal.SIGTERM)
+        with pytest.raises(ShutdownRequested):
+            with shutdown.idle():
+                pass
+
+    def test_signal_handler_does_not_log(self, caplog):
+        import logging
+
+        from shutdown import Shutdown
+
+        shutdown = Shutdown()
+        with caplog.at_level(logging.INFO):
+            shutdown.request(signal.SIGTERM)
+            assert caplog.records == [], (
+                'Обработчик сигнала не должен писать в лог.'
+            )
+            shutdown.log_signal()
+        assert 'SIGTERM' in caplog.text
+
+    def test_deadline_counts_from_first_signal(self):
+        from shutdown import Shutdown
+
+        now = [100.0]
+        shutdown = Shutdown(timeout=30, clock=lambda: now[0])
+        assert shutdown.remaining() == 30
+        shutdown.request()
+        now[0] += 10
+        shutdown.request()
+        assert shutdown.remaining() == 20
+        now[0] += 30
+        assert shutdown.remaining() == 0
+
+
+class TestEngineShutdown:
+    def test_in_flight_poll_finishes_and_is_saved(self, monkeypatch,
+                                                   tmp_path,
+                                                   random_timestamp):
+        import engine
+        from checkpoint import LogCheckpointStore
+        from shutdown import Shutdown
+
+        shutdown = Shutdown(timeout=5)
+        calls = []
+
+        def slow_get(*args, **kwargs):
+            calls.append(kwargs['headers']['Authorization'])
+            shutdown.request()
+            time.sleep(0.1)
+            response = utils.MockResponseGET(random_timestamp=random_timestamp)
+            response.json = lambda: {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+            return response
+
+        monkeypatch.setattr(requests, 'get', slow_get)
+        bot = utils.MockTelegramBot()
+        sent = []
+        bot.send_message = lambda chat_id, text: sent.append(chat_id)
+        tenants = [
+            engine.Tenant(f'token{i}', f'chat{i}', timestamp=0)
+            for i in range(3)
+        ]
+        path = str(tmp_path / 'state.log')
+        polling = engine.PollingEngine(
+            bot, tenants, concurrency=1, retry_period=0.01,
+            store=LogCheckpointStore(path), shutdown=shutdown,
+        )
+        asyncio.run(polling.run())
+        polling.store.close()
+
+        assert len(calls) == 1, (
+            'После сигнала остановки новые опросы начинаться не должны.'
+        )
+        saved = LogCheckpointStore(path).load_all()
+        assert [checkpoint.timestamp for checkpoint in saved.values()] == [
+            random_timestamp
+        ], 'Начатый опрос должен завершиться и сохранить состояние.'
+        assert len(sent) == 1
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import pytest
+
+# Печатает модули, которые действительно выполнились при импорте.
+PROBE = '''
+import sys
+import importlib.util
+import {module}
+print(' '.join(
+    name for name, value in sys.modules.items()
+    if type(value) is not importlib.util._LazyModule
+))
+'''
+
+
+def loaded_modules(module):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module)],
+        capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+class TestStartup:
+    @pytest.mark.parametrize('heavy', ['requests', 'telegram', 'sqlite3'])
+    def test_homework_defers_heavy_imports(self, heavy):
+        assert heavy not in loaded_modules('homework')
+
+    @pytest.mark.parametrize('module', ['engine', 'supervisor'])
+    @pytest.mark.parametrize('heavy', ['requests', 'telegram'])
+    def test_worker_path_defers_heavy_imports(self, module, heavy):
+        assert heavy not in loaded_modules(module), (
+            'Рабочий процесс должен загружать зависимость при первом '
+            'обращении, а не при импорте.'
+        )
+
+    def test_engine_defers_command_handlers(self):
+        loaded = loaded_modules('engine')
+        assert 'telegram.ext' not in loaded
+        assert 'commands' not in loaded
+
+    def test_lazy_module_loads_on_attribute_access(self):
+        from lazy import lazy_import
+
+        module = lazy_import('colorsys')
+        assert module.rgb_to_hsv(0, 0, 0) == (0, 0, 0)
+        assert lazy_import('colorsys') is module
+
+    def test_missing_module_fails_at_import(self):
+        from lazy import lazy_import
+
+        with pytest.raises(ModuleNotFoundError):
+            lazy_import('no_such_module_here')
@@ -0,0 +1,101 @@
+import sqlite3
+
+
+class TestStatusSnapshot:
+    def test_diff_reports_every_changed_homework(self):
+        from status_diff import StatusSnapshot
+
+        snapshot = StatusSnapshot({'1': 'reviewing', '2': 'reviewing'})
+        homeworks = [
+            {'id': 1, 'homework_name': 'a', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'b', 'status': 'reviewing'},
+            {'id': 3, 'homework_name': 'c', 'status': 'rejected'},
+        ]
+        changed = snapshot.diff(homeworks)
+        assert [hw['id'] for hw in changed] == [1, 3], (
+            'Должны возвращаться все работы с новым статусом, '
+            'а не только первая.'
+        )
+
+    def test_dump_load_roundtrip(self):
+        from status_diff import StatusSnapshot
+
+        snapshot = StatusSnapshot()
+        snapshot.update({'homework_name': 'hw', 'status': 'approved'})
+        restored = StatusSnapshot.load(snapshot.dump())
+        assert restored.statuses == {'hw': 'approved'}
+        assert not restored.diff([{'homework_name': 'hw',
+                                   'status': 'approved'}])
+
+    def test_statuses_are_shared_between_snapshots(self):
+        import json
+
+        from status_diff import StatusSnapshot
+
+        first, second = StatusSnapshot(), StatusSnapshot()
+        for snapshot in (first, second):
+            snapshot.update(json.loads(
+                '{"homework_name": "hw", "status": "approved"}'
+            ))
+        assert first.statuses['hw'] is second.statuses['hw'], (
+            'Одинаковые статусы разных пользователей должны быть '
+            'одним объектом строки.'
+        )
+        assert first.names is None
+
+
+class TestNotifyChanges:
+    def test_one_message_per_change(self, monkeypatch, homework_module):
+        from status_diff import StatusSnapshot
+
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message))
+        snapshot = StatusSnapshot()
+        homeworks = [
+            {'id': 1, 'homework_name': 'a', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'b', 'status': 'rejected'},
+        ]
+        homework_module.notify_changes(None, snapshot, homeworks, 0, 1)
+        assert len(sent) == 2
+        homework_module.notify_changes(None, snapshot, homeworks, 1, 2)
+        assert len(sent) == 2, 'Повторный статус не должен отправляться.'
+
+    def test_empty_list_reported_once(self, monkeypatch, homework_module):
+        from status_diff import StatusSnapshot
+
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message))
+        snapshot = StatusSnapshot()
+        for timestamp in range(3):
+            homework_module.notify_changes(
+                None, snapshot, [], timestamp, timestamp + 1
+            )
+        assert len(sent) == 1
+        assert sent[0].startswith('Список домашних работ пустой')
+
+
+class TestCheckpointSnapshot:
+    def test_sqlite_migrates_old_table(self, tmp_path):
+        from checkpoint import Checkpoint, SQLiteCheckpointStore
+
+        path = str(tmp_path / 'state.db')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE checkpoints (key TEXT PRIMARY KEY, '
+            'timestamp INTEGER, status TEXT, message TEXT)'
+        )
+        connection.execute(
+            "INSERT INTO checkpoints VALUES ('a', 1, 'approved', 'm')"
+        )
+        connection.commit()
+        connection.close()
+
+        store = SQLiteCheckpointStore(path)
+        assert store.load_all() == {'a': Checkpoint(1, 'approved', 'm')}
+        store.save('a', Checkpoint(2, None, '', {'statuses': {'1': 'x'}}))
+        store.close()
+        assert SQLiteCheckpointStore(path).load_all()['a'].snapshot == {
+            'statuses': {'1': 'x'}
+        }
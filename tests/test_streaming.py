@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from exception import DateInResponseNotExist
+
+
+def chunked(payload, size):
+    data = payload.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestHomeworkStream:
+    @pytest.mark.parametrize('size', [1, 7, 4096])
+    def test_yields_homeworks_one_by_one(self, size):
+        from streaming import HomeworkStream
+
+        data = {
+            'current_date': 1000198991,
+            'homeworks': [
+                {'id': i, 'homework_name': f'дз {i}', 'status': 'approved'}
+                for i in range(20)
+            ],
+        }
+        stream = HomeworkStream(chunked(json.dumps(data), size))
+        assert list(stream) == data['homeworks']
+        assert stream.current_date == 1000198991
+
+    @pytest.mark.parametrize('payload, error', [
+        ('[{"homeworks": [], "current_date": 1}]', TypeError),
+        ('{"homeworks": {"a": 1}, "current_date": 1}', TypeError),
+        ('{"current_date": 1}', TypeError),
+        ('{"homeworks": []}', DateInResponseNotExist),
+        ('{"homeworks": [1,', ValueError),
+    ])
+    def test_invalid_shape(self, payload, error):
+        from streaming import HomeworkStream
+
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(payload, 3)))
+
+    def test_number_split_between_chunks(self):
+        from streaming import HomeworkStream
+
+        stream = HomeworkStream(['{"current_date": 12', '34, "homeworks": []}'])
+        assert list(stream) == []
+        assert stream.current_date == 1234
+
+    def test_close_releases_response(self):
+        from streaming import HomeworkStream
+
+        closed = []
+        stream = HomeworkStream(
+            ['{"homeworks": [1'], close=lambda: closed.append(1)
+        )
+        with pytest.raises(ValueError):
+            list(stream)
+        stream.close()
+        assert closed == [1]
@@ -0,0 +1,108 @@
+import random
+import time
+
+
+class TestHashRing:
+    def keys(self, count):
+        rng = random.Random(1)
+        return [f'chat{rng.getrandbits(64)}' for _ in range(count)]
+
+    def test_keys_spread_evenly(self):
+        from supervisor import HashRing
+
+        ring = HashRing(f'worker-{i}' for i in range(4))
+        counts = {}
+        for key in self.keys(4000):
+            node = ring.node_for(key)
+            counts[node] = counts.get(node, 0) + 1
+        assert len(counts) == 4
+        assert min(counts.values()) > 700
+        assert max(counts.values()) < 1300
+
+    def test_adding_node_moves_few_keys(self):
+        from supervisor import HashRing
+
+        ring = HashRing(f'worker-{i}' for i in range(4))
+        keys = self.keys(4000)
+        before = {key: ring.node_for(key) for key in keys}
+        ring.add_node('worker-4')
+        moved = [key for key in keys if ring.node_for(key) != before[key]]
+        assert all(ring.node_for(key) == 'worker-4' for key in moved)
+        assert len(moved) < len(keys) * 0.3
+        ring.remove_node('worker-4')
+        assert {key: ring.node_for(key) for key in keys} == before
+
+    def test_shards_cover_all_tenants(self):
+        from engine import Tenant
+        from supervisor import shard_tenants
+
+        tenants = [Tenant(f'token{i}', f'chat{i}') for i in range(50)]
+        shards = [shard_tenants(tenants, number, 3) for number in range(3)]
+        keys = sorted(tenant.key for shard in shards for tenant in shard)
+        assert keys == sorted(tenant.key for tenant in tenants)
+
+
+class TestWorkerMetrics:
+    def test_render_labels_each_worker(self):
+        from metrics import Counter, Registry
+        from supervisor import WorkerMetrics
+
+        registry = Registry()
+        counter = Counter('errors', 'Ошибки.', registry=registry)
+        counter.inc(exception='RequestUnclear')
+        aggregated = WorkerMetrics()
+        aggregated.update(0, registry.collect())
+        counter.inc(exception='RequestUnclear')
+        aggregated.update(1, registry.collect())
+        text = aggregated.render()
+        assert text.count('# TYPE errors counter') == 1
+        assert 'errors_total{worker="0",exception="RequestUnclear"} 1' in text
+        assert 'errors_total{worker="1",exception="RequestUnclear"} 2' in text
+
+
+class FakeProcess:
+    name = 'worker-0'
+    exitcode = 1
+
+    def __init__(self, alive):
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+class TestRestartBackoff:
+    def make(self, monkeypatch):
+        import supervisor
+
+        sup = supervisor.Supervisor(workers=1)
+        monkeypatch.setattr(sup, 'start_worker', lambda number: None)
+        return sup
+
+    def test_startup_crash_keeps_growing_delay(self, monkeypatch):
+        sup = self.make(monkeypatch)
+        sup.processes[0] = FakeProcess(alive=True)
+        sup.started_at[0] = time.monotonic()
+        for _ in range(3):
+            sup.metrics_queue.put((0, []))
+            sup.collect_metrics(0.2)
+            sup.processes[0] = FakeProcess(alive=False)
+            sup.check_workers()
+            sup.restart_at.clear()
+        assert sup.failures[0] == 3, (
+            'Метрики упавшего при запуске процесса не должны обнулять '
+            'счётчик его падений.'
+        )
+
+    def test_long_running_worker_resets_failures(self, monkeypatch):
+        import supervisor
+
+        sup = self.make(monkeypatch)
+        sup.failures[0] = 5
+        sup.processes[0] = FakeProcess(alive=True)
+        sup.started_at[0] = time.monotonic()
+        sup.check_workers()
+        assert sup.failures[0] == 5
+        sup.started_at[0] -= supervisor.HEALTHY_UPTIME
+        sup.check_workers()
+        assert sup.failures[0] == 0
@@ -0,0 +1,128 @@
+import json
+import os
+
+import pytest
+
+
+def write(path, data, mtime):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    os.utime(path, ns=(mtime, mtime))
+
+
+def record(token, chat_id, **extra):
+    return {'practicum_token': token, 'chat_id': chat_id, **extra}
+
+
+class TestParseConfig:
+    def test_list_and_dict_formats(self):
+        from tenant_config import parse_config
+
+        tenants = [record('a', 1), record('b', 2, locale='en')]
+        plain = parse_config(tenants)
+        full = parse_config({
+            'tenants': tenants,
+            'intervals': {'reviewing': 30, 'default': 900},
+        })
+        assert plain.tenants == full.tenants
+        assert [r.locale for r in full.tenants.values()] == [None, 'en']
+        assert full.intervals['reviewing'] == 30
+        assert full.intervals[None] == 900
+        assert full.intervals['approved'] == plain.intervals['approved']
+
+    @pytest.mark.parametrize('data', [
+        {'tenants': {}},
+        {'tenants': [], 'intervals': {'reviewing': 0}},
+        {'tenants': [], 'intervals': [60]},
+        {'tenants': [], 'intervals': {'reviewing': float('nan')}},
+        {'tenants': [], 'intervals': {'default': float('inf')}},
+        [{'chat_id': 1}],
+    ])
+    def test_invalid_config(self, data):
+        from tenant_config import parse_config
+
+        with pytest.raises((TypeError, ValueError, KeyError)):
+            parse_config(data)
+
+
+class TestConfigWatcher:
+    def test_reloads_only_changed_file(self, tmp_path):
+        from tenant_config import ConfigWatcher
+
+        path = tmp_path / 'tenants.json'
+        write(path, [record('a', 1)], 10 ** 9)
+        watcher = ConfigWatcher(str(path), interval=0)
+        assert list(watcher.load().tenants.values())[0].token == 'a'
+        assert watcher.poll() is None
+
+        write(path, [record('a', 1), record('b', 2)], 2 * 10 ** 9)
+        assert len(watcher.poll().tenants) == 2
+        assert watcher.poll() is None
+
+    def test_broken_file_keeps_running(self, tmp_path):
+        from tenant_config import ConfigWatcher
+
+        path = tmp_path / 'tenants.json'
+        write(path, [record('a', 1)], 10 ** 9)
+        watcher = ConfigWatcher(str(path), interval=0)
+        watcher.load()
+        path.write_text('[{"practicum_token":', encoding='utf-8')
+        os.utime(path, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+        assert watcher.poll() is None
+        write(path, {'tenants': [], 'intervals': [60]}, 3 * 10 ** 9)
+        assert watcher.poll() is None, (
+            'Ошибка разбора файла не должна останавливать опрос.'
+        )
+
+    def test_accept_selects_own_tenants(self, tmp_path):
+        from checkpoint import make_key
+        from tenant_config import ConfigWatcher
+
+        path = tmp_path / 'tenants.json'
+        write(path, [record('a', 1), record('b', 2)], 10 ** 9)
+        own = make_key('b', 2)
+        watcher = ConfigWatcher(str(path), accept=lambda key: key == own)
+        assert list(watcher.load().tenants) == [own]
+
+
+class TestApplyConfig:
+    def test_only_changed_tenants_are_touched(self):
+        import engine
+        from tenant_config import parse_config
+
+        config = parse_config([
+            record('a', 1), record('b', 2), record('c', 3),
+        ])
+        tenants = engine.make_tenants(config.tenants.values())
+        tenants[1].status = 'reviewing'
+        polling = engine.PollingEngine(None, tenants, retry_period=600)
+        for tenant in tenants:
+            polling.scheduler.add(tenant, 600)
+        deadlines = {
+            tenant.chat_id: polling.scheduler._entries[tenant][0]
+            for tenant in tenants
+        }
+        reloaded = []
+        polling.on_reload = reloaded.append
+
+        polling.apply_config(parse_config({
+            'tenants': [
+                record('a', 1, locale='en'), record('b', 2), record('d', 4),
+            ],
+            'intervals': {'reviewing': 5},
+        }))
+
+        by_chat = {tenant.chat_id: tenant for tenant in polling.tenants}
+        assert sorted(by_chat) == [1, 2, 4]
+        assert tenants[2] not in polling.scheduler, (
+            'Удалённый пользователь должен сниматься с расписания.'
+        )
+        assert by_chat[4] in polling.scheduler
+        assert by_chat[1] is tenants[0] and by_chat[1].locale == 'en'
+        assert polling.scheduler._entries[tenants[0]][0] == deadlines[1], (
+            'Срок опроса незатронутого пользователя не должен меняться.'
+        )
+        assert polling.scheduler._entries[tenants[1]][0] < deadlines[2], (
+            'Пользователя со статусом, интервал которого сократился, '
+            'нужно перенести.'
+        )
+        assert reloaded == [polling.tenants]